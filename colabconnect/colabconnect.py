@@ -1,18 +1,30 @@
 from pathlib import Path
 import subprocess
-from importlib import import_module
+from importlib.util import find_spec
 import time
 import sys
 import os
 import shutil
 import socket
-import tempfile
 import ssl
 import threading
-import select
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import queue
+import selectors
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import http.client
 import urllib.parse
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+import json
+import logging
+import re
+import hashlib
+import random
+import ipaddress
+from functools import lru_cache
+
+
+# Per-connection proxy messages; debug output appears only if the caller enables it
+log = logging.getLogger(__name__)
 
 
 message = """
@@ -21,26 +33,131 @@ message = """
 - Select: 'Remote-Tunnels: Connect to Tunnel' to connect to colab
 """.strip()
 
+# Environment overrides that turn off certificate checks in the VSCode tunnel itself
+_TUNNEL_SSL_ENV = {
+    "NODE_TLS_REJECT_UNAUTHORIZED": "0",
+    "CURL_CA_BUNDLE": "",  # Empty to disable curl certificate verification
+    "SSL_CERT_FILE": "",  # Empty to disable Python SSL certificate verification
+}
+
+# The same plus git and npm, for the Proxytunnel launch and explicit SSL bypass requests
+_SSL_BYPASS_ENV = {
+    **_TUNNEL_SSL_ENV,
+    "GIT_SSL_NO_VERIFY": "1",  # For git operations
+    "npm_config_strict_ssl": "false",  # For npm
+}
+
+# Variables pointing the tools at a custom CA bundle
+_CA_BUNDLE_ENV_VARS = ("NODE_EXTRA_CA_CERTS", "SSL_CERT_FILE", "REQUESTS_CA_BUNDLE", "CURL_CA_BUNDLE")
+
+# Proxy variables, in both spellings since tools disagree on the case
+_PROXY_ENV_VARS = ("HTTPS_PROXY", "HTTP_PROXY", "http_proxy", "https_proxy")
+
+# Command line for the VSCode CLI tunnel; SSL settings are passed through env
+TUNNEL_ARGS = ["./code", "tunnel", "--verbose", "--accept-server-license-terms",
+               "--name", "colab-connect", "--log", "debug"]
+
+# Packages installed into the Colab kernel for editing from VSCode
+PYTHON_PACKAGES = ("flake8", "black", "ipywidgets", "twine", "ipykernel")
+
+VSCODE_CLI_URL = "https://code.visualstudio.com/sha/download?build=stable&os=cli-alpine-x64"
+
+# Seconds a CLI download attempt may stall on connect or read; with 3 attempts
+# each via the proxy and then directly, a dead network gives up in 90 seconds
+DOWNLOAD_TIMEOUT = 15
+
+# Probe URLs for proxy tests; several in case some are blocked
+TEST_URLS = [
+    "https://github.com",
+    "https://ifconfig.me",
+    "https://api.ipify.org",
+    "https://icanhazip.com",
+    "https://checkip.amazonaws.com"
+]
+
+# curl options for connectivity probes: bounded time, only the HTTP status is read
+CURL_PROBE_ARGS = ["curl", "-sS", "--connect-timeout", "3", "--max-time", "5",
+                   "-o", "/dev/null", "-w", "%{http_code}"]
+
+# Seconds before a probe command is killed; a backstop for curl's own --max-time
+PROBE_TIMEOUT = 10
+
+# Tunnel log keywords that need a reaction, found in a single pass per line
+_TUNNEL_EVENTS = re.compile(r"(?i)to grant access to the server|open this link|error|failed|proxy")
+
+# Successful proxychains probes, persisted so kernel restarts can skip the test
+PROBE_CACHE_PATH = Path("/tmp/colabconnect_probe.json")
+
+# Seconds a saved probe success is trusted before the proxy is tested again
+PROBE_CACHE_TTL = 3600
+
+
+def _load_probe_cache():
+    """Load the proxychains probe results (key -> time.time() of the success) saved earlier."""
+    try:
+        with open(PROBE_CACHE_PATH) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+_probe_cache = _load_probe_cache()
+
+# Tools known to be installed; failures are not cached so a later call can retry
+_installed_cache = {}
+
+
+@lru_cache(maxsize=16)
+def _which(name):
+    """Cached shutil.which; call _which.cache_clear() after installing anything."""
+    return shutil.which(name)
+
+
+def fetch_proxychains_source():
+    """Shallow-clone the proxychains-ng sources unless they or the tool are already there."""
+    import tempfile
+    
+    if _installed_cache.get("proxychains4") or _which("proxychains4"):
+        return
+    if Path("proxychains-ng").exists():
+        return
+    # Clone next to the final directory and move it into place only once git
+    # is done, so an interrupted clone is not mistaken for a usable checkout
+    staging_dir = tempfile.mkdtemp(prefix=".proxychains-ng.", dir=".")
+    try:
+        checkout = os.path.join(staging_dir, "proxychains-ng")
+        subprocess.run(["git", "clone", "--depth", "1", "https://github.com/rofl0r/proxychains-ng.git",
+                        checkout], check=True)
+        os.replace(checkout, "proxychains-ng")
+    finally:
+        shutil.rmtree(staging_dir, ignore_errors=True)
+
+
 def check_proxychains_installed():
     """Check if proxychains-ng is installed and install it if not."""
-    if shutil.which("proxychains4"):
+    if _installed_cache.get("proxychains4"):
+        return True
+    if _which("proxychains4"):
         print("proxychains-ng is already installed")
+        _installed_cache["proxychains4"] = True
         return True
     
     print("Installing proxychains-ng...")
     # Clone the repository if not already present
-    if not Path("proxychains-ng").exists():
-        subprocess.run(["git", "clone", "https://github.com/rofl0r/proxychains-ng.git"], check=True)
-    
-    # Build and install proxychains-ng
-    os.chdir("proxychains-ng")
-    subprocess.run(["./configure", "--prefix=/usr", "--sysconfdir=/etc"], check=True)
-    subprocess.run(["make"], check=True)
-    subprocess.run(["make", "install"], check=True)
-    os.chdir("..")
-    
-    if shutil.which("proxychains4"):
+    fetch_proxychains_source()
+    
+    # Build and install proxychains-ng, reusing any earlier configure/build
+    if not Path("proxychains-ng/Makefile").exists():
+        subprocess.run(["./configure", "--prefix=/usr", "--sysconfdir=/etc"],
+                       cwd="proxychains-ng", check=True)
+    if not Path("proxychains-ng/proxychains4").exists():
+        subprocess.run(["make", f"-j{os.cpu_count() or 2}"], cwd="proxychains-ng", check=True)
+    subprocess.run(["make", "install"], cwd="proxychains-ng", check=True)
+    _which.cache_clear()
+    
+    if _which("proxychains4"):
         print("proxychains-ng installed successfully")
+        _installed_cache["proxychains4"] = True
         return True
     else:
         print("Failed to install proxychains-ng")
@@ -49,8 +166,11 @@ def check_proxychains_installed():
 
 def check_proxytunnel_installed():
     """Check if proxytunnel is installed and install it if not."""
-    if shutil.which("proxytunnel"):
+    if _installed_cache.get("proxytunnel"):
+        return True
+    if _which("proxytunnel"):
         print("proxytunnel is already installed")
+        _installed_cache["proxytunnel"] = True
         return True
     
     # Check if ./proxytunnel exists in current directory
@@ -58,15 +178,18 @@ def check_proxytunnel_installed():
         print("proxytunnel binary found in current directory")
         # Make sure it's executable
         os.chmod("./proxytunnel", 0o755)
+        _installed_cache["proxytunnel"] = True
         return True
     
     print("Installing proxytunnel using apt...")
     try:
         # Install proxytunnel using apt
         subprocess.run(["apt", "install", "-y", "proxytunnel"], check=True)
+        _which.cache_clear()
         
-        if shutil.which("proxytunnel"):
+        if _which("proxytunnel"):
             print("proxytunnel installed successfully via apt")
+            _installed_cache["proxytunnel"] = True
             return True
         else:
             print("Failed to install proxytunnel via apt")
@@ -76,41 +199,268 @@ def check_proxytunnel_installed():
         return False
 
 
+@lru_cache(maxsize=128)
 def strip_protocol(url):
-    """Strip protocol prefix from URL."""
-    if url.startswith("http://"):
-        return url[7:]
-    elif url.startswith("https://"):
-        return url[8:]
-    return url
+    """Strip protocol prefix from URL.
+    
+    Any userinfo, port or path after the host is dropped as well, so
+    "https://user@host:443/x" becomes "host" and "http://[::1]:3128"
+    becomes "::1".
+    """
+    if "://" not in url:
+        return url
+    return urllib.parse.urlsplit(url).hostname or url
+
+
+# Successful lookups are reused for this many seconds, like a typical DNS cache
+DNS_CACHE_TTL = 900
+
+# Failed lookups are remembered briefly so a broken resolver is not hammered
+DNS_NEGATIVE_TTL = 10
+
+# Maps hostname to (ip_address or None, time.monotonic() of the lookup)
+_dns_cache = {}
+
+
+# Public DNS-over-HTTPS resolvers raced against the system resolver for GitHub domains
+DOH_ENDPOINTS = ("https://1.1.1.1/dns-query", "https://dns.google/resolve")
+
+
+def _resolve_system(hostname):
+    """Resolve hostname with the system resolver."""
+    # IPv4 only: skips the AAAA query, which often stalls on Colab VMs;
+    # AI_ADDRCONFIG keeps glibc from querying families with no configured address
+    infos = socket.getaddrinfo(hostname, None, socket.AF_INET, socket.SOCK_STREAM,
+                               0, socket.AI_ADDRCONFIG | socket.AI_NUMERICSERV)
+    return infos[0][4][0]
+
+
+def _resolve_doh(endpoint, hostname):
+    """Resolve hostname to an IPv4 address with a JSON DNS-over-HTTPS query."""
+    import urllib.request
+    
+    url = f"{endpoint}?name={urllib.parse.quote(hostname)}&type=A"
+    request = urllib.request.Request(url, headers={"Accept": "application/dns-json"})
+    # Direct and certificate-checked: an unverified answer could redirect GitHub logins
+    opener = urllib.request.build_opener(
+        urllib.request.ProxyHandler({}),
+        urllib.request.HTTPSHandler(context=_verified_ssl_context())
+    )
+    with opener.open(request, timeout=5) as response:
+        answers = json.load(response).get("Answer", [])
+    for answer in answers:
+        if answer.get("type") == 1:  # A record
+            return answer["data"]
+    raise socket.gaierror(f"{endpoint} returned no A record for {hostname}")
 
 
-def resolve_hostname(hostname):
-    """Resolve hostname to IP address."""
+def resolve_hostname(hostname, use_doh=False):
+    """
+    Resolve hostname to IP address, reusing recent answers.
+    
+    With use_doh, the system resolver and DOH_ENDPOINTS are queried at the
+    same time and the first answer wins, so a stalled resolver does not hold
+    up the lookup. Only enable it for public names: internal hosts such as
+    the corporate proxy would be leaked to the public resolvers, and could
+    resolve differently there under split-horizon DNS.
+    """
     # Strip protocol prefix if present
     hostname = strip_protocol(hostname)
     
+    # IPv4 literals need no lookup, and the DoH resolvers cannot answer them anyway
     try:
-        print(f"Resolving hostname: {hostname}")
-        ip_address = socket.gethostbyname(hostname)
-        print(f"Resolved {hostname} to {ip_address}")
-        return ip_address
-    except socket.gaierror as e:
-        print(f"Failed to resolve hostname {hostname}: {str(e)}")
-        return None
+        return str(ipaddress.IPv4Address(hostname))
+    except ValueError:
+        pass
+    
+    cached = _dns_cache.get(hostname)
+    if cached:
+        ttl = DNS_CACHE_TTL if cached[0] else DNS_NEGATIVE_TTL
+        if time.monotonic() - cached[1] < ttl:
+            return cached[0]
+    
+    print(f"Resolving hostname: {hostname}")
+    endpoints = DOH_ENDPOINTS if use_doh else ()
+    executor = ThreadPoolExecutor(max_workers=1 + len(endpoints))
+    futures = [executor.submit(_resolve_system, hostname)]
+    futures += [executor.submit(_resolve_doh, endpoint, hostname) for endpoint in endpoints]
+    errors = []
+    try:
+        for future in as_completed(futures):
+            try:
+                ip_address = future.result()
+            except Exception as e:
+                errors.append(e)
+                continue
+            print(f"Resolved {hostname} to {ip_address}")
+            _dns_cache[hostname] = (ip_address, time.monotonic())
+            return ip_address
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+    
+    print(f"Failed to resolve hostname {hostname}: {str(errors[0])}")
+    _dns_cache[hostname] = (None, time.monotonic())
+    return None
+
+
+def clear_dns_cache():
+    """Forget all cached lookups so the next resolve_hostname call queries DNS again."""
+    _dns_cache.clear()
 
 
+def _resolve_proxy(proxy_url):
+    """
+    Strip the protocol from a proxy URL and resolve its host to an IP address.
+    
+    Args:
+        proxy_url (str): The URL of the corporate proxy
+        
+    Returns:
+        tuple: (host without protocol, IP address or None if it could not be resolved)
+    """
+    clean_proxy_url = strip_protocol(proxy_url)
+    try:
+        # Numeric proxies need no DNS lookup
+        ipaddress.ip_address(clean_proxy_url)
+        return clean_proxy_url, clean_proxy_url
+    except ValueError:
+        return clean_proxy_url, resolve_hostname(clean_proxy_url)
+
+
+def _url_host(host):
+    """Return host as it goes in a URL, with IPv6 literals in brackets."""
+    return f"[{host}]" if ":" in host else host
+
+
+def _proxy_address(proxy_url, proxy_port):
+    """
+    Resolve the proxy host once and build the curl-style proxy string for it.
+    
+    Args:
+        proxy_url (str): The URL of the corporate proxy
+        proxy_port (int): The port of the corporate proxy
+        
+    Returns:
+        tuple: (IP address, or the host if it could not be resolved, proxy string)
+    """
+    clean_url, ip = _resolve_proxy(proxy_url)
+    ip = ip or clean_url
+    # Keep an explicit https:// prefix for curl-style proxy strings
+    scheme = "https" if proxy_url.startswith("https://") else "http"
+    return ip, f"{scheme}://{_url_host(ip)}:{proxy_port}"
+
+
+@lru_cache(maxsize=1)
 def create_ssl_unverified_context():
-    """Create an SSL context that doesn't verify certificates."""
-    context = ssl.create_default_context()
+    """Create an SSL context that doesn't verify certificates, shared by all callers."""
+    # Nothing is verified, so the CA store is never loaded
+    context = ssl.SSLContext(ssl.PROTOCOL_TLS_CLIENT)
     context.check_hostname = False
     context.verify_mode = ssl.CERT_NONE
     return context
 
 
+@lru_cache(maxsize=1)
+def _verified_ssl_context():
+    """Verifying SSL context shared by connection tests, built on first use."""
+    # Loading the CA store takes tens of ms, so it is not done at import time
+    return ssl.create_default_context()
+
+
+# Bytes moved per read when relaying CONNECT tunnels; about one TCP receive window
+FORWARD_BUFFER_SIZE = 64 * 1024
+
+
+class BufferPool:
+    """Thread-safe pool of reusable bytearrays for relaying tunnel traffic."""
+    
+    def __init__(self, size, count):
+        self.size = size
+        self._free = queue.LifoQueue(maxsize=count)
+    
+    def get(self):
+        """Take a buffer from the pool, allocating a new one if it is empty."""
+        try:
+            return self._free.get_nowait()
+        except queue.Empty:
+            return bytearray(self.size)
+    
+    def put(self, buf):
+        """Return a buffer to the pool; it is dropped if the pool is full."""
+        try:
+            self._free.put_nowait(buf)
+        except queue.Full:
+            pass
+
+
+# Worker threads of the local proxy server; each open CONNECT tunnel holds one
+PROXY_MAX_WORKERS = max(16, (os.cpu_count() or 1) * 4)
+
+# Two buffers per tunnel, so a fully busy proxy never allocates
+_forward_buffers = BufferPool(FORWARD_BUFFER_SIZE, 2 * PROXY_MAX_WORKERS)
+
+
+# Headers that describe a single connection and must not be relayed; the body
+# is also relayed dechunked, so Transfer-Encoding does not carry over either
+_HOP_BY_HOP_HEADERS = ("Connection", "Proxy-Connection", "Keep-Alive", "TE", "Trailer",
+                       "Transfer-Encoding", "Upgrade")
+_HOP_BY_HOP_LOWER = frozenset(name.lower() for name in _HOP_BY_HOP_HEADERS)
+
+# Methods that may be sent again after a failure without repeating a side effect
+_IDEMPOTENT_METHODS = frozenset(("GET", "HEAD", "OPTIONS", "PUT", "DELETE"))
+
+# Seconds to wait on the upstream proxy before a forwarded request fails
+PROXY_UPSTREAM_TIMEOUT = 60
+
+# Keep-alive connections to the upstream proxy, one per handler thread
+_proxy_connections = threading.local()
+
+
+def _splice_one_way(name, src, dst):
+    """
+    Move data from src to dst through a pipe with os.splice until either side closes.
+    
+    Both sockets are shut down on return, which also ends the opposite direction.
+    
+    Args:
+        name (str): Label of the source side for log messages
+        src (socket.socket): Socket to read from
+        dst (socket.socket): Socket to write to
+    """
+    flags = os.SPLICE_F_MOVE | os.SPLICE_F_MORE
+    read_fd, write_fd = os.pipe()
+    try:
+        while True:
+            n = os.splice(src.fileno(), write_fd, FORWARD_BUFFER_SIZE, flags=flags)
+            if not n:
+                log.debug("%s closed connection", name.capitalize())
+                break
+            while n:
+                n -= os.splice(read_fd, dst.fileno(), n, flags=flags)
+    except OSError as e:
+        log.warning("Error forwarding from %s: %s", name, e)
+    finally:
+        os.close(read_fd)
+        os.close(write_fd)
+        for sock in (src, dst):
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
 class ProxyHTTPRequestHandler(BaseHTTPRequestHandler):
     """HTTP request handler that forwards requests to a target server through a proxy."""
     
+    # Tunnels carry many small interactive frames; send them without Nagle delays
+    disable_nagle_algorithm = True
+    
+    def log_message(self, format, *args):
+        """Send the per-request access log to the module logger instead of stderr."""
+        log.debug("%s - " + format, self.address_string(), *args)
+    
     def __init__(self, *args, proxy_url=None, proxy_port=None, **kwargs):
         self.proxy_url = proxy_url
         self.proxy_port = proxy_port
@@ -122,15 +472,16 @@ class ProxyHTTPRequestHandler(BaseHTTPRequestHandler):
         host, port = self.path.split(':')
         port = int(port)
         
-        print(f"CONNECT request for {host}:{port}")
+        log.debug("CONNECT request for %s:%d", host, port)
         
         try:
             # Create a direct connection to the target
             target_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            target_socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             target_socket.settimeout(10)
             
             # Connect directly to the target (bypassing the proxy)
-            print(f"Connecting directly to {host}:{port}")
+            log.debug("Connecting directly to %s:%d", host, port)
             target_socket.connect((host, port))
             
             # Send a 200 response to the client
@@ -144,66 +495,33 @@ class ProxyHTTPRequestHandler(BaseHTTPRequestHandler):
             # Forward data between the client and the target
             self._forward_data(client_socket, target_socket)
         except Exception as e:
-            print(f"Error in CONNECT: {str(e)}")
+            log.warning("Error in CONNECT: %s", e)
             self.send_error(502, f"Bad Gateway: {str(e)}")
     
     def _forward_data(self, client_socket, target_socket):
         """Forward data between the client and the target."""
         if not client_socket or not target_socket:
-            print("Error: Invalid sockets for forwarding")
+            log.error("Invalid sockets for forwarding")
             return
-            
+        
+        tunnel = (client_socket, target_socket)
+        self.server.track_tunnel(tunnel)
         try:
-            # Set sockets to non-blocking mode
-            client_socket.setblocking(0)
-            target_socket.setblocking(0)
-            
-            # Set timeout
-            timeout = 1
-            
-            # Forward data until one of the sockets is closed
-            while True:
-                # Wait for data from either socket
-                inputs = [client_socket, target_socket]
-                try:
-                    readable, _, exceptional = select.select(inputs, [], inputs, timeout)
-                except select.error as e:
-                    print(f"Select error: {str(e)}")
-                    break
-                
-                # If there was an error with a socket, close both
-                if exceptional:
-                    print("Socket exception")
-                    break
-                
-                # Read from client socket
-                if client_socket in readable:
-                    try:
-                        data = client_socket.recv(4096)
-                        if not data:
-                            print("Client closed connection")
-                            break
-                        target_socket.sendall(data)
-                    except Exception as e:
-                        print(f"Error reading from client: {str(e)}")
-                        break
-                
-                # Read from target socket
-                if target_socket in readable:
-                    try:
-                        data = target_socket.recv(4096)
-                        if not data:
-                            print("Target closed connection")
-                            break
-                        client_socket.sendall(data)
-                    except Exception as e:
-                        print(f"Error reading from target: {str(e)}")
-                        break
+            if self.server.stop_event.is_set():
+                return
+            client_socket.settimeout(None)
+            target_socket.settimeout(None)
+            # On Linux the kernel can move the bytes itself (Python 3.10+)
+            if hasattr(os, "splice"):
+                self._splice_data(client_socket, target_socket)
+            else:
+                self._select_data(client_socket, target_socket)
         except Exception as e:
-            print(f"Error in data forwarding: {str(e)}")
+            log.warning("Error in data forwarding: %s", e)
         finally:
+            self.server.track_tunnel(tunnel, active=False)
             # Close both sockets
-            print("Closing connections")
+            log.debug("Closing connections")
             try:
                 client_socket.close()
             except:
@@ -212,7 +530,44 @@ class ProxyHTTPRequestHandler(BaseHTTPRequestHandler):
                 target_socket.close()
             except:
                 pass
-        
+    
+    def _select_data(self, client_socket, target_socket):
+        """Relay both directions on this thread through recv_into and sendall."""
+        # One selector per tunnel; recv only runs on sockets reported readable,
+        # so both sockets stay blocking and sendall needs no retry handling
+        sel = selectors.DefaultSelector()
+        client_buf = _forward_buffers.get()
+        target_buf = _forward_buffers.get()
+        try:
+            # Each direction reads into its own pooled buffer
+            sel.register(client_socket, selectors.EVENT_READ, ("client", target_socket, client_buf))
+            sel.register(target_socket, selectors.EVENT_READ, ("target", client_socket, target_buf))
+            
+            # Forward data until one of the sockets is closed
+            while True:
+                for key, _ in sel.select():
+                    name, peer, buf = key.data
+                    try:
+                        n = key.fileobj.recv_into(buf)
+                    except OSError as e:
+                        log.warning("Error reading from %s: %s", name, e)
+                        return
+                    if not n:
+                        log.debug("%s closed connection", name.capitalize())
+                        return
+                    peer.sendall(memoryview(buf)[:n])
+        finally:
+            sel.close()
+            _forward_buffers.put(client_buf)
+            _forward_buffers.put(target_buf)
+    
+    def _splice_data(self, client_socket, target_socket):
+        """Relay each direction with os.splice, so the data never enters user space."""
+        upstream = threading.Thread(target=_splice_one_way,
+                                    args=("client", client_socket, target_socket), daemon=True)
+        upstream.start()
+        _splice_one_way("target", target_socket, client_socket)
+        upstream.join()
     
     def do_GET(self):
         """Handle GET requests."""
@@ -251,29 +606,130 @@ class ProxyHTTPRequestHandler(BaseHTTPRequestHandler):
         content_length = int(self.headers.get('Content-Length', 0))
         body = self.rfile.read(content_length) if content_length > 0 else None
         
-        # Create a connection to the proxy
-        proxy_conn = http.client.HTTPConnection(self.proxy_url, self.proxy_port)
-        
-        # Prepare headers for the proxy
-        headers = dict(self.headers)
-        
-        # Send the request to the proxy
-        proxy_conn.request(method, self.path, body=body, headers=headers)
-        
-        # Get the response from the proxy
-        proxy_response = proxy_conn.getresponse()
+        # Forward the client's headers as they are, minus the hop-by-hop ones;
+        # http.client derives Host from the absolute request URL
+        headers = self.headers
+        for name in _HOP_BY_HOP_HEADERS + ("Host",):
+            del headers[name]
         
-        # Forward the response to the client
-        self.send_response(proxy_response.status, proxy_response.reason)
-        for header, value in proxy_response.getheaders():
-            self.send_header(header, value)
-        self.end_headers()
-        
-        # Forward the response body
-        self.wfile.write(proxy_response.read())
-        
-        # Close the proxy connection
-        proxy_conn.close()
+        # Send the request over this thread's kept-alive proxy connection; if the
+        # proxy dropped it while idle, reconnect and send once more, unless the
+        # request was already written and replaying it could repeat its effect
+        proxy_conn = self._proxy_connection()
+        try:
+            sent = False
+            try:
+                proxy_conn.request(method, self.path, body=body, headers=headers)
+                sent = True
+                proxy_response = proxy_conn.getresponse()
+            except (ConnectionError, http.client.HTTPException):
+                if sent and method not in _IDEMPOTENT_METHODS:
+                    raise
+                proxy_conn.close()
+                proxy_conn.request(method, self.path, body=body, headers=headers)
+                proxy_response = proxy_conn.getresponse()
+            
+            # Forward the response to the client
+            self.send_response(proxy_response.status, proxy_response.reason)
+            for header, value in proxy_response.getheaders():
+                if header.lower() not in _HOP_BY_HOP_LOWER:
+                    self.send_header(header, value)
+            self.end_headers()
+            
+            # Stream the response body through a pooled buffer instead of holding it
+            # all in memory; reading it to the end frees the connection for reuse
+            buf = _forward_buffers.get()
+            view = memoryview(buf)
+            try:
+                while True:
+                    n = proxy_response.readinto(buf)
+                    if not n:
+                        break
+                    self.wfile.write(view[:n])
+            finally:
+                view.release()
+                _forward_buffers.put(buf)
+        except BaseException:
+            # A half-sent request or half-read response leaves the connection in
+            # a state the next request cannot use, so start over with a new one
+            proxy_conn.close()
+            raise
+    
+    def _proxy_connection(self):
+        """Return this thread's connection to the proxy, creating it on first use."""
+        conn = getattr(_proxy_connections, "conn", None)
+        if conn is None or (conn.host, conn.port) != (self.proxy_url, self.proxy_port):
+            if conn is not None:
+                conn.close()
+            conn = http.client.HTTPConnection(self.proxy_url, self.proxy_port,
+                                              timeout=PROXY_UPSTREAM_TIMEOUT)
+            _proxy_connections.conn = conn
+        return conn
+
+
+class PooledHTTPServer(ThreadingHTTPServer):
+    """ThreadingHTTPServer that serves requests on a bounded, reused worker pool."""
+    
+    def __init__(self, *args, max_workers=PROXY_MAX_WORKERS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_workers = max_workers
+        # Set by server_close; open CONNECT tunnels are shut down at the same time
+        self.stop_event = threading.Event()
+        self._pending = queue.Queue()
+        self._lock = threading.Lock()
+        self._workers = 0
+        # Waiting workers minus queued connections; negative means a backlog
+        self._idle = 0
+        self._tunnels = set()
+    
+    def process_request(self, request, client_address):
+        """Hand the connection to a pool worker instead of a new thread."""
+        with self._lock:
+            self._idle -= 1
+            spawn = self._idle < 0 and self._workers < self.max_workers
+            if spawn:
+                self._workers += 1
+                self._idle += 1
+        # Daemon workers, unlike ThreadPoolExecutor's, never keep the
+        # interpreter alive while a tunnel is still open
+        if spawn:
+            threading.Thread(target=self._worker, daemon=True).start()
+        self._pending.put((request, client_address))
+    
+    def _worker(self):
+        """Serve queued connections until server_close sends None."""
+        while True:
+            item = self._pending.get()
+            if item is None:
+                return
+            self.process_request_thread(*item)
+            with self._lock:
+                self._idle += 1
+    
+    def track_tunnel(self, sockets, active=True):
+        """Register or unregister the sockets of an open CONNECT tunnel."""
+        with self._lock:
+            if active:
+                self._tunnels.add(sockets)
+            else:
+                self._tunnels.discard(sockets)
+    
+    def server_close(self):
+        """Close the listening socket, end open tunnels and stop the workers."""
+        self.stop_event.set()
+        super().server_close()
+        with self._lock:
+            tunnels = list(self._tunnels)
+            workers = self._workers
+        # Shutting the sockets down wakes both relay loops, so tunnels end at once
+        for sockets in tunnels:
+            for sock in sockets:
+                try:
+                    sock.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+        for _ in range(workers):
+            self._pending.put(None)
 
 
 def start_proxy_server(proxy_url, proxy_port, bind_port=0):
@@ -292,7 +748,7 @@ def start_proxy_server(proxy_url, proxy_port, bind_port=0):
     handler = lambda *args, **kwargs: ProxyHTTPRequestHandler(*args, proxy_url=proxy_url, proxy_port=proxy_port, **kwargs)
     
     # Create the server
-    server = HTTPServer(('127.0.0.1', bind_port), handler)
+    server = PooledHTTPServer(('127.0.0.1', bind_port), handler)
     
     # Get the port the server is listening on
     port = server.server_port
@@ -307,6 +763,15 @@ def start_proxy_server(proxy_url, proxy_port, bind_port=0):
     return server, port
 
 
+# Configs written by create_proxychains_config, keyed by its arguments
+_proxychains_configs = {}
+
+
+def _config_digest(data):
+    """Return a short digest used to detect unchanged proxychains configs."""
+    return hashlib.blake2b(data, digest_size=16).digest()
+
+
 def create_proxychains_config(proxy_url="proxy.company.com", proxy_port=8080,
                              enable_proxy_dns=True):
     """
@@ -323,20 +788,19 @@ def create_proxychains_config(proxy_url="proxy.company.com", proxy_port=8080,
     """
     config_path = Path("proxychains_vscode.conf")
     
-    
+    # Same arguments as an earlier call and the file is untouched: nothing to do
+    key = (proxy_url, proxy_port, enable_proxy_dns)
+    cached = _proxychains_configs.get(key)
+    if cached and config_path.exists() and _config_digest(config_path.read_bytes()) == cached:
+        return config_path.absolute()
     
     # Original behavior - resolve hostname to IP
-    clean_proxy_url = strip_protocol(proxy_url)
-    proxy_ip = clean_proxy_url
+    clean_proxy_url, proxy_ip = _resolve_proxy(proxy_url)
     proxy_port_to_use = proxy_port
-        
-    if not all(c.isdigit() or c == '.' for c in clean_proxy_url):
-        resolved_ip = resolve_hostname(clean_proxy_url)
-        if resolved_ip:
-            proxy_ip = resolved_ip
-        else:
-            print(f"WARNING: Could not resolve {clean_proxy_url} to an IP address. Proxychains requires numeric IPs.")
-            print("Using the hostname anyway, but it will likely fail.")
+    if not proxy_ip:
+        print(f"WARNING: Could not resolve {clean_proxy_url} to an IP address. Proxychains requires numeric IPs.")
+        print("Using the hostname anyway, but it will likely fail.")
+        proxy_ip = clean_proxy_url
     
     # Determine whether to include proxy_dns based on parameter
     dns_setting = "proxy_dns_old" if enable_proxy_dns else "# proxy_dns disabled"
@@ -352,14 +816,186 @@ tcp_connect_time_out 8000
 http {proxy_ip} {proxy_port_to_use} connect
 """
     
-    with open(config_path, "w") as f:
-        f.write(config_content)
+    # Skip the write when the file on disk already has these exact contents
+    config_bytes = config_content.encode()
+    digest = _config_digest(config_bytes)
+    _proxychains_configs[key] = digest
+    if config_path.exists() and _config_digest(config_path.read_bytes()) == digest:
+        print(f"Reusing proxychains configuration at {config_path.absolute()}")
+        return config_path.absolute()
+    
+    # Write a temporary file and swap it in, so concurrent probes never read
+    # a half-written config
+    tmp_path = config_path.with_suffix(".tmp")
+    fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        os.write(fd, config_bytes)
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+    os.replace(tmp_path, config_path)
     
     print(f"Created custom proxychains configuration at {config_path.absolute()}")
     return config_path.absolute()
 
 
 
+def _probe_key(proxy_url, proxy_port, enable_proxy_dns):
+    """Build the probe cache key for a proxy and the installed proxychains4."""
+    return json.dumps([proxy_url, proxy_port, enable_proxy_dns, _which("proxychains4")])
+
+
+def _save_probe_result(key):
+    """Record a successful proxychains probe in the on-disk cache."""
+    _probe_cache[key] = time.time()
+    try:
+        with open(PROBE_CACHE_PATH, "w") as f:
+            json.dump(_probe_cache, f)
+    except OSError as e:
+        print(f"Could not save proxychains probe cache: {str(e)}")
+
+
+def _first_success(probe, items, cancel_event=None):
+    """
+    Run probe(item) for all items concurrently and stop at the first success.
+    
+    Probes that have not started yet are cancelled once one succeeds. Probes
+    already running are told to stop through cancel_event, if given.
+    
+    Args:
+        probe (callable): Function returning True on success
+        items (list): Arguments to probe, one probe per item
+        cancel_event (threading.Event): Set when a probe succeeds
+        
+    Returns:
+        bool: True if any probe returned True, False otherwise
+    """
+    executor = ThreadPoolExecutor(max_workers=len(items))
+    futures = [executor.submit(probe, item) for item in items]
+    try:
+        for future in as_completed(futures):
+            if future.result():
+                if cancel_event is not None:
+                    cancel_event.set()
+                return True
+        return False
+    finally:
+        for future in futures:
+            future.cancel()
+        executor.shutdown(wait=False)
+
+
+# Errors that another attempt cannot fix, such as a missing curl or proxychains4 binary
+_UNRECOVERABLE_ERRORS = (FileNotFoundError, PermissionError)
+
+
+def _retry(attempt_once, attempts=3, base=0.5, cap=2.0, cancel_event=None):
+    """
+    Call attempt_once until it succeeds, backing off with jittered exponential delays.
+    
+    Each delay is drawn uniformly from zero up to the exponential bound, so
+    probes started together do not retry in lockstep. Errors in
+    _UNRECOVERABLE_ERRORS raised by attempt_once end the retries at once.
+    
+    Args:
+        attempt_once (callable): Called with the 1-based attempt number, returns True on success
+        attempts (int): Maximum number of attempts
+        base (float): Upper bound of the delay after the first failed attempt
+        cap (float): Upper bound for the delay between attempts
+        cancel_event (threading.Event): Stops further attempts once set
+        
+    Returns:
+        bool: True if an attempt succeeded, False otherwise
+    """
+    for attempt in range(1, attempts + 1):
+        if cancel_event is not None and cancel_event.is_set():
+            return False
+        try:
+            if attempt_once(attempt):
+                return True
+        except _UNRECOVERABLE_ERRORS as e:
+            print(f"Not retrying: {str(e)}")
+            return False
+        if attempt < attempts:
+            delay = random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+            print(f"Waiting {delay:.2f} seconds before retry...")
+            # Waiting on the event lets a cancellation cut the delay short
+            if cancel_event is not None:
+                cancel_event.wait(delay)
+            else:
+                time.sleep(delay)
+    return False
+
+
+def _run_probe(argv, timeout=30, cancel_event=None, env=None):
+    """
+    Run a probe command like subprocess.run, but kill it once cancel_event is set.
+    
+    Args:
+        argv (list): The command and its arguments
+        timeout (int): Seconds before the command is killed and TimeoutExpired raised
+        cancel_event (threading.Event): Kills the command early once set
+        env (dict): Environment for the command
+        
+    Returns:
+        subprocess.CompletedProcess: The finished command, or None if it was cancelled
+    """
+    deadline = time.monotonic() + timeout
+    with subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env) as process:
+        while True:
+            try:
+                stdout, stderr = process.communicate(timeout=0.25)
+                return subprocess.CompletedProcess(argv, process.returncode, stdout, stderr)
+            except subprocess.TimeoutExpired:
+                cancelled = cancel_event is not None and cancel_event.is_set()
+                if cancelled or time.monotonic() >= deadline:
+                    process.kill()
+                    process.communicate()
+                    if cancelled:
+                        return None
+                    raise subprocess.TimeoutExpired(argv, timeout)
+
+
+def _probe_proxychains_url(config_path, test_url, cancel_event=None):
+    """
+    Fetch one URL through proxychains, retrying up to 3 times.
+    
+    Args:
+        config_path (Path): Path to the proxychains config file
+        test_url (str): URL to fetch
+        cancel_event (threading.Event): Kills the running attempt and stops retrying once set
+        
+    Returns:
+        bool: True if the URL was fetched successfully, False otherwise
+    """
+    print(f"Testing proxychains with URL: {test_url}")
+    test_command = ["proxychains4", "-f", str(config_path)] + CURL_PROBE_ARGS + [test_url]
+    
+    def attempt_once(attempt):
+        try:
+            print(f"{test_url}: attempt {attempt} of 3...")
+            result = _run_probe(test_command, timeout=PROBE_TIMEOUT, cancel_event=cancel_event)
+            if result is None:
+                return False
+            
+            status = result.stdout.decode('utf-8', 'replace').strip()
+            if result.returncode == 0 and status.startswith(("2", "3")):
+                print(f"Proxychains test successful! HTTP {status} from {test_url}")
+                return True
+            print(f"Proxychains test of {test_url} failed with return code {result.returncode} (HTTP {status or 'none'})")
+            print(f"Error output: {result.stderr.decode('utf-8', 'replace')}")
+        except subprocess.TimeoutExpired:
+            print(f"Proxychains test of {test_url} timed out after {PROBE_TIMEOUT} seconds on attempt {attempt}")
+        except _UNRECOVERABLE_ERRORS:
+            raise
+        except Exception as e:
+            print(f"Proxychains test of {test_url} failed with exception: {str(e)}")
+        return False
+    
+    # Try up to 3 times with each URL
+    return _retry(attempt_once, cancel_event=cancel_event)
+
+
 def test_proxychains(proxy_url, proxy_port, enable_proxy_dns=True):
     """
     Test if proxychains-ng is working correctly with the given proxy.
@@ -372,6 +1008,22 @@ def test_proxychains(proxy_url, proxy_port, enable_proxy_dns=True):
     Returns:
         bool: True if proxychains test was successful, False otherwise
     """
+    key = _probe_key(proxy_url, proxy_port, enable_proxy_dns)
+    passed_at = _probe_cache.get(key)
+    if isinstance(passed_at, (int, float)) and time.time() - passed_at < PROBE_CACHE_TTL:
+        print("Proxychains test already passed for this proxy, skipping")
+        return True
+    
+    # A cheap TCP connect to the proxy first: if it is unreachable, every
+    # curl probe would only run into its timeout
+    clean_proxy_url, proxy_ip = _resolve_proxy(proxy_url)
+    proxy_ip = proxy_ip or clean_proxy_url
+    try:
+        socket.create_connection((proxy_ip, int(proxy_port)), timeout=3).close()
+    except OSError as e:
+        print(f"Proxy {proxy_ip}:{proxy_port} is unreachable ({str(e)}), skipping proxychains test")
+        return False
+    
     print("Testing proxychains-ng with a simple command...")
     
     # Create proxychains config
@@ -379,53 +1031,18 @@ def test_proxychains(proxy_url, proxy_port, enable_proxy_dns=True):
         proxy_url, proxy_port, enable_proxy_dns
     )
     
-    # Try different test URLs in case one is blocked
-    test_urls = [
-        "https://github.com",
-        "https://ifconfig.me",
-        "https://api.ipify.org",
-        "https://icanhazip.com",
-        "https://checkip.amazonaws.com"
-    ]
-    
-    # Try each URL
-    for test_url in test_urls:
-        print(f"Testing proxychains with URL: {test_url}")
-        test_command = f"proxychains4 -f {config_path} curl -s {test_url}"
-        
-        # Try up to 3 times with each URL
-        for attempt in range(1, 4):
-            try:
-                print(f"Attempt {attempt} of 3...")
-                result = subprocess.run(
-                    test_command,
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=30
-                )
-                
-                if result.returncode == 0:
-                    print(f"Proxychains test successful! External IP: {result.stdout.decode('utf-8').strip()}")
-                    return True
-                else:
-                    print(f"Proxychains test failed with return code {result.returncode}")
-                    print(f"Error output: {result.stderr.decode('utf-8')}")
-                    
-            except subprocess.TimeoutExpired:
-                print(f"Proxychains test timed out after 30 seconds on attempt {attempt}")
-                if attempt < 3:
-                    print(f"Waiting 2 seconds before retry...")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Proxychains test failed with exception: {str(e)}")
-                if attempt < 3:
-                    print(f"Waiting 2 seconds before retry...")
-                    time.sleep(2)
+    # Probe all test URLs at once; a single working URL is enough
+    cancel_event = threading.Event()
+    if _first_success(lambda test_url: _probe_proxychains_url(config_path, test_url, cancel_event),
+                      TEST_URLS, cancel_event):
+        _save_probe_result(key)
+        return True
     
     # If we get here, all URLs and attempts failed
     print("All proxychains tests failed after multiple attempts with different URLs.")
     return False
+
+
 def start_tunnel_with_proxytunnel(proxy_url=None, proxy_port=None, proxy_user=None, proxy_pass=None,
                                 use_ntlm=False, use_ssl=False) -> None:
     """
@@ -454,8 +1071,8 @@ def start_tunnel_with_proxytunnel(proxy_url=None, proxy_port=None, proxy_user=No
             print("ERROR: Could not find or verify VSCode CLI. Cannot start tunnel.")
             return None
     
-    # Prepare the command
-    base_command = "NODE_TLS_REJECT_UNAUTHORIZED=0 ./code tunnel --verbose --accept-server-license-terms --name colab-connect --log debug"
+    # Prepare the command; NODE_TLS_REJECT_UNAUTHORIZED is set through env
+    command = TUNNEL_ARGS
     
     try:
         if use_proxytunnel:
@@ -473,90 +1090,24 @@ def start_tunnel_with_proxytunnel(proxy_url=None, proxy_port=None, proxy_user=No
             proxytunnel_process = start_proxytunnel(config)
             
             if proxytunnel_process:
-                # Set environment variables for the VSCode tunnel to use the local proxy
-                env = os.environ.copy()
-                env["HTTPS_PROXY"] = f"http://localhost:{config['local_port']}"
-                env["HTTP_PROXY"] = f"http://localhost:{config['local_port']}"
-                env["http_proxy"] = f"http://localhost:{config['local_port']}"
-                env["https_proxy"] = f"http://localhost:{config['local_port']}"
-                # Disable SSL verification for all processes
-                env["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-                env["CURL_CA_BUNDLE"] = ""  # Empty to disable curl certificate verification
-                env["SSL_CERT_FILE"] = ""    # Empty to disable Python SSL certificate verification
-                env["GIT_SSL_NO_VERIFY"] = "1"  # For git operations
-                env["npm_config_strict_ssl"] = "false"  # For npm
-                env["SSL_CERT_FILE"] = ""    # Empty to disable Python SSL certificate verification
-                
                 print(f"Starting VSCode tunnel with Proxytunnel using local port {config['local_port']}")
-                command = base_command
             else:
                 print("Proxytunnel failed to start. Falling back to direct connection.")
                 use_proxytunnel = False
-                env = os.environ.copy()
-                # Disable SSL verification
-                env["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-                env["CURL_CA_BUNDLE"] = ""
-                env["SSL_CERT_FILE"] = ""
-                env["GIT_SSL_NO_VERIFY"] = "1"
-                env["npm_config_strict_ssl"] = "false"
         else:
-            command = base_command
             print("Starting VSCode tunnel directly (without Proxytunnel)")
-            env = os.environ.copy()
-            # Disable SSL verification
-            env["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-            env["CURL_CA_BUNDLE"] = ""
-            env["SSL_CERT_FILE"] = ""
-            env["GIT_SSL_NO_VERIFY"] = "1"
-            env["npm_config_strict_ssl"] = "false"
-        
-        # Start the process with both stdout and stderr captured
-        print(f"Executing command: {command}")
-        
-        # Ensure SSL verification is disabled in the environment
-        if 'NODE_TLS_REJECT_UNAUTHORIZED' not in env:
-            env["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-        if 'CURL_CA_BUNDLE' not in env:
-            env["CURL_CA_BUNDLE"] = ""
-        if 'SSL_CERT_FILE' not in env:
-            env["SSL_CERT_FILE"] = ""
-        
-        p = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True,
-            env=env
-        )
         
-        # Use separate threads to read stdout and stderr to avoid blocking
-        from threading import Thread
-        
-        def read_output(pipe, prefix):
-            try:
-                for line in iter(pipe.readline, ''):
-                    print(f"{prefix}: {line.strip()}")
-                    if "To grant access to the server" in line:
-                        print(f"IMPORTANT: {line.strip()}")
-                    if "Open this link" in line:
-                        print("Tunnel is starting...")
-                        time.sleep(5)
-                        print(message)
-                    # Look for specific error messages
-                    if "error" in line.lower() or "failed" in line.lower():
-                        print(f"TUNNEL ERROR: {line.strip()}")
-                    if "proxy" in line.lower() and ("error" in line.lower() or "failed" in line.lower()):
-                        print(f"PROXY ERROR: {line.strip()}")
-            except Exception as e:
-                print(f"Error reading from {prefix}: {str(e)}")
+        # Disable SSL verification for all processes, in one copy of the environment
+        env = {**os.environ, **_SSL_BYPASS_ENV}
+        if use_proxytunnel:
+            # Set environment variables for the VSCode tunnel to use the local proxy
+            local_proxy = f"http://localhost:{config['local_port']}"
+            env.update(dict.fromkeys(_PROXY_ENV_VARS, local_proxy))
         
-        # Start threads to read output
-        Thread(target=read_output, args=(p.stdout, "STDOUT")).start()
-        Thread(target=read_output, args=(p.stderr, "STDERR")).start()
+        # Start the process with both stdout and stderr captured
+        print(f"Executing command: {' '.join(command)}")
         
-        # Wait for the process to complete
-        p.wait()
+        returncode = _run_tunnel(command, env, _format_tunnel_line_with_errors)
         
         # Clean up the proxytunnel process if it was started
         if use_proxytunnel and proxytunnel_process:
@@ -567,8 +1118,8 @@ def start_tunnel_with_proxytunnel(proxy_url=None, proxy_port=None, proxy_user=No
                 print(f"Error terminating Proxytunnel process: {str(e)}")
         
         # Check the return code
-        if p.returncode != 0:
-            print(f"WARNING: VSCode tunnel process exited with code {p.returncode}")
+        if returncode != 0:
+            print(f"WARNING: VSCode tunnel process exited with code {returncode}")
             
             # If proxytunnel failed, try direct connection
             if use_proxytunnel:
@@ -590,6 +1141,13 @@ def start_tunnel_with_proxytunnel(proxy_url=None, proxy_port=None, proxy_user=No
         return None
 
 
+def _report_fetch_error(future):
+    """Print why the background proxychains-ng clone failed, if it did."""
+    error = future.exception()
+    if error is not None:
+        print(f"Error fetching proxychains-ng sources: {str(error)}")
+
+
 def start_tunnel_with_fallbacks(proxy_url, proxy_port, proxy_user=None, proxy_pass=None,
                               use_ntlm=False, use_ssl=False):
     """
@@ -603,6 +1161,14 @@ def start_tunnel_with_fallbacks(proxy_url, proxy_port, proxy_user=None, proxy_pa
         use_ntlm (bool): Whether to use NTLM authentication
         use_ssl (bool): Whether to use SSL to connect to the proxy
     """
+    # Fetch the proxychains sources while the Proxytunnel probes run; the
+    # clone has no side effects beyond the checkout, so building and
+    # installing are left until the fallback is actually needed
+    fallback_executor = ThreadPoolExecutor(max_workers=1)
+    proxychains_fetched = fallback_executor.submit(fetch_proxychains_source)
+    proxychains_fetched.add_done_callback(_report_fetch_error)
+    fallback_executor.shutdown(wait=False)
+    
     # Try Proxytunnel first
     if check_proxytunnel_installed():
         # Try different target configurations
@@ -612,7 +1178,7 @@ def start_tunnel_with_fallbacks(proxy_url, proxy_port, proxy_user=None, proxy_pa
             {"host": "online.visualstudio.com", "port": 443}
         ]
         
-        for target in targets:
+        def probe_target(target):
             print(f"Trying Proxytunnel with target {target['host']}:{target['port']}")
             
             if proxy_user and proxy_pass:
@@ -623,24 +1189,36 @@ def start_tunnel_with_fallbacks(proxy_url, proxy_port, proxy_user=None, proxy_pa
                 )
             else:
                 config = configure_proxytunnel(proxy_url, proxy_port, target["host"], target["port"])
-                
-            # Test the connection first
-            if test_proxytunnel_connection(config):
+            
+            if test_proxytunnel_connection(config, cancel_event):
                 print(f"Proxytunnel connection test successful with target {target['host']}:{target['port']}")
-                
-                # Start the tunnel with this configuration
-                start_tunnel_with_proxytunnel(
-                    proxy_url, proxy_port, proxy_user, proxy_pass, use_ntlm, use_ssl
-                )
-                return
-            else:
-                print(f"Proxytunnel connection test failed with target {target['host']}:{target['port']}")
+                return True
+            print(f"Proxytunnel connection test failed with target {target['host']}:{target['port']}")
+            return False
+        
+        # Test all targets at once and stop the remaining probes at the first success
+        cancel_event = threading.Event()
+        success = _first_success(probe_target, targets, cancel_event)
+        
+        if success:
+            # Start the tunnel with this configuration
+            start_tunnel_with_proxytunnel(
+                proxy_url, proxy_port, proxy_user, proxy_pass, use_ntlm, use_ssl
+            )
+            return
         
         print("All Proxytunnel configurations failed")
     
     # Try proxychains-ng as fallback
     print("Trying proxychains-ng as fallback")
-    if check_proxychains_installed():
+    # Let the background clone finish; if it failed, the install below retries it
+    wait([proxychains_fetched])
+    try:
+        proxychains_installed = check_proxychains_installed()
+    except Exception as e:
+        print(f"Error installing proxychains-ng: {str(e)}")
+        proxychains_installed = False
+    if proxychains_installed:
         start_tunnel(proxy_url, proxy_port, enable_proxy_dns=False)
         return
     
@@ -649,16 +1227,62 @@ def start_tunnel_with_fallbacks(proxy_url, proxy_port, proxy_user=None, proxy_pa
     start_tunnel_direct()
 
 
+# Ports handed out to a proxytunnel config that has not been started yet
+_reserved_ports = set()
+_reserved_ports_lock = threading.Lock()
+
+
 def find_available_port():
     """
     Find an available port on the local machine.
     
+    A returned port stays reserved until release_port is called, so configs
+    created concurrently get distinct ports even before proxytunnel binds them.
+    
     Returns:
         int: An available port number
     """
-    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
-        s.bind(('127.0.0.1', 0))
-        return s.getsockname()[1]
+    with _reserved_ports_lock:
+        while True:
+            with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+                s.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+                s.bind(('127.0.0.1', 0))
+                port = s.getsockname()[1]
+            if port not in _reserved_ports:
+                _reserved_ports.add(port)
+                return port
+
+
+def release_port(port):
+    """Drop the reservation taken by find_available_port once the port is bound or unused."""
+    with _reserved_ports_lock:
+        _reserved_ports.discard(port)
+
+
+def _wait_for_port(port, host="127.0.0.1", timeout=5.0, interval=0.05, process=None):
+    """
+    Wait until something accepts TCP connections on host:port.
+    
+    Args:
+        port (int): Port to connect to
+        host (str): Host to connect to
+        timeout (float): Seconds to keep trying
+        interval (float): Seconds between connection attempts
+        process (subprocess.Popen): Stop waiting early if this process exits
+        
+    Returns:
+        bool: True once a connection succeeded, False on timeout or process exit
+    """
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            return False
+        try:
+            socket.create_connection((host, port), timeout=interval).close()
+            return True
+        except OSError:
+            time.sleep(interval)
+    return False
 
 
 def start_proxytunnel(config):
@@ -671,10 +1295,20 @@ def start_proxytunnel(config):
     Returns:
         subprocess.Popen: The running proxytunnel process
     """
-    print(f"Starting Proxytunnel with command: {config['command']}")
+    try:
+        return _launch_proxytunnel(config)
+    finally:
+        # By now proxytunnel holds the port, so the OS will not hand it out
+        # again, or the launch failed and never will use it
+        release_port(config['local_port'])
+
+
+def _launch_proxytunnel(config):
+    """Start proxytunnel for config and wait until it listens; None on failure."""
+    print(f"Starting Proxytunnel with command: {' '.join(config['argv'])}")
     
     # Verify that the proxytunnel binary exists and is executable
-    proxytunnel_path = config['command'].split()[0]
+    proxytunnel_path = config['argv'][0]
     if not os.path.exists(proxytunnel_path):
         print(f"ERROR: Proxytunnel binary not found at {proxytunnel_path}")
         return None
@@ -691,36 +1325,29 @@ def start_proxytunnel(config):
     try:
         # Start the process
         process = subprocess.Popen(
-            config['command'],
-            shell=True,
+            config['argv'],
             stdout=subprocess.PIPE,
             stderr=subprocess.PIPE,
-            universal_newlines=True
+            bufsize=0
         )
         
-        # Use separate threads to read stdout and stderr to avoid blocking
-        from threading import Thread
-        
-        def read_output(pipe, prefix):
-            try:
-                for line in iter(pipe.readline, ''):
-                    print(f"{prefix}: {line.strip()}")
-            except Exception as e:
-                print(f"Error reading from {prefix}: {str(e)}")
+        # Proxytunnel keeps running after we return, so drain both pipes
+        # from a single background thread
+        threading.Thread(
+            target=_drain_pipes,
+            args=(process, _format_line),
+            kwargs={"prefixes": ("PROXYTUNNEL", "PROXYTUNNEL ERROR")},
+            daemon=True
+        ).start()
         
-        # Start threads to read output
-        Thread(target=read_output, args=(process.stdout, "PROXYTUNNEL")).start()
-        Thread(target=read_output, args=(process.stderr, "PROXYTUNNEL ERROR")).start()
-        
-        # Wait a moment for the tunnel to establish
-        time.sleep(2)
+        # Wait until Proxytunnel is listening instead of sleeping a fixed time
+        if not _wait_for_port(config['local_port'], process=process):
+            print(f"Proxytunnel is not listening on port {config['local_port']} yet, continuing anyway")
         
         # Check if the process is still running
         if process.poll() is not None:
+            # Its error output has already been printed by the drain thread
             print(f"Proxytunnel process exited with code {process.returncode}")
-            stderr_output = process.stderr.read()
-            if stderr_output:
-                print(f"Error output: {stderr_output}")
             return None
         
         print(f"Proxytunnel started successfully on local port {config['local_port']}")
@@ -730,12 +1357,67 @@ def start_proxytunnel(config):
         return None
 
 
-def test_proxytunnel_connection(config):
+def _probe_proxytunnel_url(env, test_url, cancel_event=None):
+    """
+    Fetch one URL through a running Proxytunnel, retrying up to 3 times.
+    
+    Args:
+        env (dict): Environment with HTTPS_PROXY pointing at the local tunnel
+        test_url (str): URL to fetch
+        cancel_event (threading.Event): Kills the running attempt and stops retrying once set
+        
+    Returns:
+        bool: True if a 2xx or 3xx response was received, False otherwise
+    """
+    print(f"Testing Proxytunnel with URL: {test_url}")
+    
+    def attempt_once(attempt):
+        try:
+            print(f"{test_url}: attempt {attempt} of 3...")
+            result = _run_probe(CURL_PROBE_ARGS + [test_url], timeout=PROBE_TIMEOUT,
+                                cancel_event=cancel_event, env=env)
+            if result is None:
+                return False
+            
+            status = result.stdout.decode('utf-8', 'replace').strip()
+            if result.returncode == 0:
+                if status.startswith(("2", "3")):
+                    print(f"Proxytunnel test successful! HTTP {status} from {test_url}")
+                    return True
+                print(f"Warning: Received HTTP {status} from {test_url}, may indicate partial connection")
+                return False
+            
+            print(f"Proxytunnel test of {test_url} failed with return code {result.returncode}")
+            error_output = result.stderr.decode('utf-8', 'replace')
+            print(f"Error output: {error_output}")
+            
+            # Check for specific error messages that might help diagnose the issue
+            if "Could not resolve host" in error_output:
+                print("DNS resolution failed. This might be a DNS configuration issue.")
+            elif "Connection refused" in error_output:
+                print("Connection refused. The proxy might be blocking the connection.")
+            elif "timed out" in error_output:
+                print("Connection timed out. The proxy might be slow or blocking the connection.")
+        except subprocess.TimeoutExpired:
+            print(f"Proxytunnel test of {test_url} timed out after {PROBE_TIMEOUT} seconds on attempt {attempt}")
+        except _UNRECOVERABLE_ERRORS:
+            raise
+        except Exception as e:
+            print(f"Proxytunnel test of {test_url} failed with exception: {str(e)}")
+        return False
+    
+    # Try up to 3 times with each URL
+    return _retry(attempt_once, cancel_event=cancel_event)
+
+
+def test_proxytunnel_connection(config, cancel_event=None):
     """
     Test if Proxytunnel is working correctly with the given configuration.
     
     Args:
         config (dict): Configuration dictionary from configure_proxytunnel
+        cancel_event (threading.Event): Abandons the test early once set,
+            e.g. when a concurrent test of another target already succeeded
         
     Returns:
         bool: True if the test was successful, False otherwise
@@ -747,76 +1429,16 @@ def test_proxytunnel_connection(config):
     if not process:
         return False
     
-    # Try different test URLs
-    test_urls = [
-        "https://github.com",
-        "https://ifconfig.me",
-        "https://api.ipify.org",
-        "https://icanhazip.com",
-        "https://checkip.amazonaws.com"
-    ]
-    
-    success = False
-    
     # Set environment variable to use the local proxy
     env = os.environ.copy()
     env["HTTPS_PROXY"] = f"http://localhost:{config['local_port']}"
     
-    # Try each URL
-    for test_url in test_urls:
-        print(f"Testing Proxytunnel with URL: {test_url}")
-        
-        # Try up to 3 times with each URL
-        for attempt in range(1, 4):
-            try:
-                print(f"Attempt {attempt} of 3...")
-                result = subprocess.run(
-                    f"curl -s --connect-timeout 10 {test_url}",
-                    shell=True,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    timeout=30,
-                    env=env
-                )
-                
-                if result.returncode == 0:
-                    response = result.stdout.decode('utf-8').strip()
-                    print(f"Proxytunnel test successful! Response: {response}")
-                    if response:  # Make sure we got a non-empty response
-                        success = True
-                        break
-                    else:
-                        print("Warning: Received empty response, may indicate partial connection")
-                else:
-                    print(f"Proxytunnel test failed with return code {result.returncode}")
-                    error_output = result.stderr.decode('utf-8')
-                    print(f"Error output: {error_output}")
-                    
-                    # Check for specific error messages that might help diagnose the issue
-                    if "Could not resolve host" in error_output:
-                        print("DNS resolution failed. This might be a DNS configuration issue.")
-                    elif "Connection refused" in error_output:
-                        print("Connection refused. The proxy might be blocking the connection.")
-                    elif "timed out" in error_output:
-                        print("Connection timed out. The proxy might be slow or blocking the connection.")
-                    
-                    # Wait before retry
-                    if attempt < 3:
-                        print(f"Waiting 2 seconds before retry...")
-                        time.sleep(2)
-            except subprocess.TimeoutExpired:
-                print(f"Proxytunnel test timed out after 30 seconds on attempt {attempt}")
-                if attempt < 3:
-                    print(f"Waiting 2 seconds before retry...")
-                    time.sleep(2)
-            except Exception as e:
-                print(f"Proxytunnel test failed with exception: {str(e)}")
-                if attempt < 3:
-                    print(f"Waiting 2 seconds before retry...")
-                    time.sleep(2)
-        
-        if success:
-            break
+    # Probe all test URLs at once; a single working URL is enough. Sharing the
+    # caller's event means a success here also stops probes of other targets.
+    if cancel_event is None:
+        cancel_event = threading.Event()
+    success = _first_success(lambda test_url: _probe_proxytunnel_url(env, test_url, cancel_event),
+                             TEST_URLS, cancel_event)
     
     # Clean up
     try:
@@ -838,7 +1460,7 @@ def configure_proxytunnel(proxy_url, proxy_port, target_host="vscode.dev", targe
         target_port (int): The target port to connect to (default: 443)
         
     Returns:
-        dict: Configuration dictionary with command and local port
+        dict: Configuration dictionary with the command argv and local port
     """
     # Find an available local port
     local_port = find_available_port()
@@ -847,14 +1469,15 @@ def configure_proxytunnel(proxy_url, proxy_port, target_host="vscode.dev", targe
     clean_proxy_url = strip_protocol(proxy_url)
     
     # Determine the path to the proxytunnel binary
-    proxytunnel_path = shutil.which("proxytunnel") or "./proxytunnel"
+    proxytunnel_path = _which("proxytunnel") or "./proxytunnel"
     
     # Create the proxytunnel command
     # Add -v for verbose output to help with debugging
-    command = f"{proxytunnel_path} -p {clean_proxy_url}:{proxy_port} -d {target_host}:{target_port} -a {local_port} -v"
+    argv = [proxytunnel_path, "-p", f"{clean_proxy_url}:{proxy_port}",
+            "-d", f"{target_host}:{target_port}", "-a", str(local_port), "-v"]
     
     return {
-        "command": command,
+        "argv": argv,
         "local_port": local_port
     }
 
@@ -876,7 +1499,7 @@ def configure_proxytunnel_advanced(proxy_url, proxy_port, target_host="vscode.de
         use_ssl (bool): Whether to use SSL to connect to the proxy
         
     Returns:
-        dict: Configuration dictionary with command and local port
+        dict: Configuration dictionary with the command argv and local port
     """
     # Find an available local port
     local_port = find_available_port()
@@ -885,29 +1508,131 @@ def configure_proxytunnel_advanced(proxy_url, proxy_port, target_host="vscode.de
     clean_proxy_url = strip_protocol(proxy_url)
     
     # Determine the path to the proxytunnel binary
-    proxytunnel_path = shutil.which("proxytunnel") or "./proxytunnel"
+    proxytunnel_path = _which("proxytunnel") or "./proxytunnel"
     
     # Start building the command
     # Add -v for verbose output to help with debugging
-    command = f"{proxytunnel_path} -p {clean_proxy_url}:{proxy_port} -d {target_host}:{target_port} -a {local_port} -v"
-    
+    argv = [proxytunnel_path, "-p", f"{clean_proxy_url}:{proxy_port}",
+            "-d", f"{target_host}:{target_port}", "-a", str(local_port), "-v"]
     
     # Add authentication if provided
     if proxy_user and proxy_pass:
         if use_ntlm:
-            command += f"  -u {proxy_user} -s {proxy_pass}"
+            argv += ["-u", proxy_user, "-s", proxy_pass]
         else:
-            command += f" -P {proxy_user}:{proxy_pass}"
+            argv += ["-P", f"{proxy_user}:{proxy_pass}"]
     
     # Add SSL if requested
     if use_ssl:
-        command += " -E"
+        argv.append("-E")
     
     return {
-        "command": command,
+        "argv": argv,
         "local_port": local_port
     }
 
+def _format_line(prefix, line):
+    """Format one line of subprocess output with its prefix."""
+    return f"{prefix}: {line.strip()}\n"
+
+
+def _format_tunnel_line(prefix, line, flag_errors=False):
+    """Format one line of VSCode tunnel output, adding notices for the login prompts."""
+    text = line.strip()
+    out = [f"{prefix}: {text}\n"]
+    tags = {keyword.lower() for keyword in _TUNNEL_EVENTS.findall(line)}
+    if not tags:
+        return out[0]
+    if "to grant access to the server" in tags:
+        out.append(f"IMPORTANT: {text}\n")
+    if "open this link" in tags:
+        out.append("Tunnel is starting...\n")
+        out.append(f"{message}\n")
+    # Look for specific error messages
+    if flag_errors and ("error" in tags or "failed" in tags):
+        out.append(f"TUNNEL ERROR: {text}\n")
+        if "proxy" in tags:
+            out.append(f"PROXY ERROR: {text}\n")
+    return "".join(out)
+
+
+def _format_tunnel_line_with_errors(prefix, line):
+    """Like _format_tunnel_line, but also flag tunnel and proxy errors."""
+    return _format_tunnel_line(prefix, line, flag_errors=True)
+
+
+def _drain_pipes(process, format_line, chunk_size=32768, prefixes=("STDOUT", "STDERR")):
+    """
+    Read a process's stdout and stderr from a single selector loop.
+    
+    Both pipes are read in large ``os.read`` blocks and split into lines, so
+    no reader threads are needed. All lines from one read are written to
+    stdout with a single write. Returns once both pipes are closed, or once
+    the process has exited and its pipes have gone quiet.
+    
+    Args:
+        process (subprocess.Popen): Process started with binary stdout/stderr pipes
+        format_line (callable): Called as ``format_line(prefix, line)``, returns the text to print
+        chunk_size (int): Number of bytes to request per ``os.read`` call
+        prefixes (tuple): Prefixes passed to format_line for stdout and stderr
+    """
+    selector = selectors.DefaultSelector()
+    selector.register(process.stdout, selectors.EVENT_READ, prefixes[0])
+    selector.register(process.stderr, selectors.EVENT_READ, prefixes[1])
+    pending = {prefix: b"" for prefix in prefixes}
+    try:
+        while selector.get_map():
+            events = selector.select(timeout=1.0)
+            if not events and process.poll() is not None:
+                break
+            out = []
+            for key, _ in events:
+                chunk = os.read(key.fd, chunk_size)
+                if not chunk:
+                    selector.unregister(key.fileobj)
+                    continue
+                *lines, pending[key.data] = (pending[key.data] + chunk).split(b"\n")
+                out.extend(format_line(key.data, line.decode("utf-8", "replace")) for line in lines)
+            if out:
+                sys.stdout.write("".join(out))
+                sys.stdout.flush()
+    finally:
+        selector.close()
+    out = [format_line(prefix, rest.decode("utf-8", "replace"))
+           for prefix, rest in pending.items() if rest]
+    if out:
+        sys.stdout.write("".join(out))
+        sys.stdout.flush()
+
+
+def _run_tunnel(command_argv, env=None, format_line=_format_tunnel_line) -> int:
+    """
+    Run a VSCode tunnel command and print its output until it exits.
+    
+    Args:
+        command_argv (list): The command and its arguments
+        env (dict): Environment for the process (default: os.environ with _TUNNEL_SSL_ENV applied)
+        format_line (callable): Formatter for each output line (default: _format_tunnel_line)
+        
+    Returns:
+        int: The exit code of the tunnel process
+    """
+    if env is None:
+        env = {**os.environ, **_TUNNEL_SSL_ENV}
+    
+    p = subprocess.Popen(
+        command_argv,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        bufsize=0,
+        env=env
+    )
+    
+    # Print stdout and stderr from one selector loop, then reap the process
+    _drain_pipes(p, format_line)
+    return p.wait()
+
+
 def start_tunnel(proxy_url=None, proxy_port=None, enable_proxy_dns=True) -> None:
     """
     Start the VSCode tunnel using proxychains-ng.
@@ -923,63 +1648,25 @@ def start_tunnel(proxy_url=None, proxy_port=None, enable_proxy_dns=True) -> None
         print("WARNING: proxychains-ng is not installed. Falling back to direct connection.")
         use_proxychains = False
     
-    # Prepare the command
-    # Add --accept-server-license-terms to the command
-    base_command = "NODE_TLS_REJECT_UNAUTHORIZED=0 ./code tunnel --verbose --accept-server-license-terms --name colab-connect --log debug"
-    
     if use_proxychains:
         config_path = create_proxychains_config(
             proxy_url, proxy_port, enable_proxy_dns
         )
-        command = f"proxychains4 -f {config_path} {base_command}"
+        command = ["proxychains4", "-f", str(config_path)] + TUNNEL_ARGS
         print(f"Starting VSCode tunnel with proxychains-ng using config: {config_path}")
         if not enable_proxy_dns:
             print("Note: proxy_dns is disabled in proxychains configuration")
     else:
-        command = base_command
+        command = TUNNEL_ARGS
         print("Starting VSCode tunnel directly (without proxychains-ng)")
     
     # Start the process with both stdout and stderr captured
-    print(f"Executing command: {command}")
-    
-    # Create environment with SSL verification disabled
-    env = os.environ.copy()
-    env["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-    env["CURL_CA_BUNDLE"] = ""  # Empty to disable curl certificate verification
-    env["SSL_CERT_FILE"] = ""    # Empty to disable Python SSL certificate verification
-    
-    p = subprocess.Popen(
-        command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True,
-        env=env
-    )
-    
-    # Use separate threads to read stdout and stderr to avoid blocking
-    from threading import Thread
-    
-    def read_output(pipe, prefix):
-        for line in iter(pipe.readline, ''):
-            print(f"{prefix}: {line.strip()}")
-            if "To grant access to the server" in line:
-                print(f"IMPORTANT: {line.strip()}")
-            if "Open this link" in line:
-                print("Tunnel is starting...")
-                time.sleep(5)
-                print(message)
-    
-    # Start threads to read output
-    Thread(target=read_output, args=(p.stdout, "STDOUT")).start()
-    Thread(target=read_output, args=(p.stderr, "STDERR")).start()
-    
-    # Wait for the process to complete
-    p.wait()
+    print(f"Executing command: {' '.join(command)}")
+    returncode = _run_tunnel(command)
     
     # Check the return code
-    if p.returncode != 0:
-        print(f"WARNING: VSCode tunnel process exited with code {p.returncode}")
+    if returncode != 0:
+        print(f"WARNING: VSCode tunnel process exited with code {returncode}")
         
         # If proxychains failed, try direct connection
         if use_proxychains:
@@ -991,82 +1678,169 @@ def start_tunnel(proxy_url=None, proxy_port=None, enable_proxy_dns=True) -> None
 
 def start_tunnel_direct():
     """Start the VSCode tunnel directly without proxychains-ng."""
-    # Add --accept-server-license-terms to the command
-    command = "NODE_TLS_REJECT_UNAUTHORIZED=0 ./code tunnel --accept-server-license-terms --verbose --name colab-connect --log debug"
-    
-    # Set environment variables to disable SSL verification
-    env = os.environ.copy()
-    env["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-    env["CURL_CA_BUNDLE"] = ""  # Empty to disable curl certificate verification
-    env["SSL_CERT_FILE"] = ""    # Empty to disable Python SSL certificate verification
-    print(f"Starting VSCode tunnel directly: {command}")
-    
-    p = subprocess.Popen(
-        command,
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        universal_newlines=True,
-        env=env
-    )
-    
-    # Use separate threads to read stdout and stderr to avoid blocking
-    from threading import Thread
-    
-    def read_output(pipe, prefix):
-        for line in iter(pipe.readline, ''):
-            print(f"{prefix}: {line.strip()}")
-            if "To grant access to the server" in line:
-                print(f"IMPORTANT: {line.strip()}")
-            if "Open this link" in line:
-                print("Tunnel is starting...")
-                time.sleep(5)
-                print(message)
-    
-    # Start threads to read output
-    Thread(target=read_output, args=(p.stdout, "STDOUT")).start()
-    Thread(target=read_output, args=(p.stderr, "STDERR")).start()
-    
-    # Wait for the process to complete
-    p.wait()
-    
+    print(f"Starting VSCode tunnel directly: {' '.join(TUNNEL_ARGS)}")
+    _run_tunnel(TUNNEL_ARGS)
     return None
 
 
-def run(command: str) -> None:
-    process = subprocess.run(command.split())
-    if process.returncode == 0:
-        print(f"Ran: {command}")
+def run(command: str) -> subprocess.Popen:
+    """Start a command without a shell and return its process handle."""
+    return subprocess.Popen(command.split())
+
+
+def run_parallel(commands) -> None:
+    """Start all commands at once, then wait for each of them to finish."""
+    processes = [(command, run(command)) for command in commands]
+    for command, process in processes:
+        returncode = process.wait()
+        if returncode == 0:
+            print(f"Ran: {command}")
+        else:
+            print(f"Command failed with exit code {returncode}: {command}")
+
+
+def _vscode_cli_runs(path):
+    """Return True if the CLI at path starts and reports its version."""
+    try:
+        result = subprocess.run([path, "--version"], stdout=subprocess.DEVNULL,
+                                stderr=subprocess.DEVNULL, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return False
+    return result.returncode == 0
 
 
+# Absolute paths of the files download_vscode_cli extracted in this process
+_extracted_cli_paths = set()
+
 
 def verify_vscode_cli():
     """Verify that the VSCode CLI is properly downloaded and extracted."""
-    if os.path.exists("./code"):
+    # ./code is relative, so remember it per working directory
+    cache_key = os.path.abspath("code")
+    if _installed_cache.get(cache_key):
+        return True
+    try:
+        mode = os.stat("./code").st_mode
+    except OSError:
+        mode = None
+    if mode is not None:
         print("VSCode CLI found at ./code")
-        # Make sure it's executable
-        os.chmod("./code", 0o755)
+        # Make sure it's executable; the stat above usually shows it already is
+        if mode & 0o755 != 0o755:
+            os.chmod("./code", 0o755)
+        # A file that merely exists may be a leftover from a broken download;
+        # only a binary that actually runs is trusted and remembered. The next
+        # download replaces it, so only a copy extracted by this process is
+        # deleted here; anything else is left for the user to inspect
+        if not _vscode_cli_runs("./code"):
+            print("VSCode CLI at ./code does not run")
+            if cache_key in _extracted_cli_paths:
+                print("Removing the downloaded copy so it is downloaded again")
+                _extracted_cli_paths.discard(cache_key)
+                os.remove("./code")
+            return False
+        _installed_cache[cache_key] = True
         return True
     else:
         print("VSCode CLI not found at ./code")
         # Check if it's in the current directory with a different name
-        code_files = list(Path(".").glob("code*"))
+        # One scandir pass; DirEntry.is_file() reuses the directory listing's file type
+        with os.scandir(".") as entries:
+            code_files = [entry for entry in entries
+                          if entry.name.startswith("code") and entry.is_file()]
         if code_files:
-            print(f"Found potential VSCode CLI files: {code_files}")
-            for file in code_files:
-                if os.path.isfile(file) and os.access(file, os.X_OK):
-                    print(f"Found executable VSCode CLI at {file}")
-                    # Create a symlink to ./code
-                    os.symlink(file, "./code")
+            print(f"Found potential VSCode CLI files: {[entry.name for entry in code_files]}")
+            for entry in code_files:
+                if os.access(entry.path, os.X_OK) and _vscode_cli_runs(entry.path):
+                    print(f"Found executable VSCode CLI at {entry.path}")
+                    # Create a symlink to ./code, replacing a dangling one
+                    # left behind by an earlier run
+                    if os.path.islink("./code"):
+                        os.unlink("./code")
+                    os.symlink(entry.name, "./code")
+                    _installed_cache[cache_key] = True
                     return True
         return False
 
 
+# urllib openers for the CLI download, keyed by proxy string (None = direct)
+_url_openers = {}
+
+
+def _url_opener(proxy_string=None):
+    """Return a reusable urllib opener that skips certificate checks, like curl -k."""
+    opener = _url_openers.get(proxy_string)
+    if opener is None:
+        import urllib.request
+        
+        proxies = {"http": proxy_string, "https": proxy_string} if proxy_string else {}
+        opener = urllib.request.build_opener(
+            urllib.request.ProxyHandler(proxies),
+            urllib.request.HTTPSHandler(context=create_ssl_unverified_context())
+        )
+        _url_openers[proxy_string] = opener
+    return opener
+
+
+def download_vscode_cli(proxy_string=None):
+    """
+    Download the VSCode CLI and extract it while the download is in flight.
+    
+    The response is extracted in-process as a gzip tar stream, so the tarball
+    is never written to disk and decompression overlaps with the transfer.
+    Files are staged in a temporary directory and moved into the working
+    directory only after the archive was read completely. Failed attempts
+    are retried with jittered backoff, up to 3 times.
+    
+    Args:
+        proxy_string (str): Proxy to download through, or None for a direct download
+        
+    Returns:
+        bool: True if the CLI was downloaded and extracted successfully
+    """
+    # Only needed for downloads, so not imported with the module
+    import tarfile
+    import tempfile
+    
+    def attempt_once(attempt):
+        # Extract next to ./code and move the files into place only once the
+        # whole archive arrived, so a cut-off stream never leaves a truncated binary
+        staging_dir = tempfile.mkdtemp(prefix=".vscode_cli.", dir=".")
+        try:
+            with _url_opener(proxy_string).open(VSCODE_CLI_URL, timeout=DOWNLOAD_TIMEOUT) as response:
+                with tarfile.open(fileobj=response, mode="r|gz", bufsize=1 << 20) as archive:
+                    # Python 3.12+ warns unless an extraction filter is chosen
+                    if hasattr(tarfile, "data_filter"):
+                        archive.extractall(staging_dir, filter="data")
+                    else:
+                        archive.extractall(staging_dir)
+            for name in os.listdir(staging_dir):
+                os.replace(os.path.join(staging_dir, name), name)
+                _extracted_cli_paths.add(os.path.abspath(name))
+        except (tarfile.TarError, EOFError) as e:
+            print(f"Extraction failed on attempt {attempt}: {str(e)}")
+            return False
+        except Exception as e:
+            print(f"Download failed on attempt {attempt}: {str(e)}")
+            return False
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+        return True
+    
+    # A dropped connection mid-transfer is common behind proxies, so retry
+    # in-process before the caller falls back to a direct download
+    if not _retry(attempt_once):
+        return False
+    
+    print("Download and extraction successful")
+    return True
+
+
 def colabconnect(proxy_url="proxy.company.com", proxy_port=8080,
                 enable_proxy_dns=True, use_proxytunnel=False,
                 proxy_user=None, proxy_pass=None, use_ntlm=False,
                 use_ssl=False, use_fallbacks=True, ca_cert_path=None,
-                disable_ssl_verification=False) -> None:
+                disable_ssl_verification=False, force_install=False) -> None:
     """
     Connect to VSCode tunnel through a corporate proxy.
     
@@ -1082,16 +1856,14 @@ def colabconnect(proxy_url="proxy.company.com", proxy_port=8080,
         use_fallbacks (bool): Whether to try fallback mechanisms if the primary method fails (default: True)
         ca_cert_path (str): Path to a custom CA certificate file (default: None)
         disable_ssl_verification (bool): Whether to disable SSL verification entirely (default: False)
+        force_install (bool): Reinstall the helper packages even if they are present (default: False)
     """
 
     # Set environment variables for custom CA certificate if provided
     if ca_cert_path:
         if os.path.exists(ca_cert_path):
             print(f"Using custom CA certificate: {ca_cert_path}")
-            os.environ["NODE_EXTRA_CA_CERTS"] = ca_cert_path
-            os.environ["SSL_CERT_FILE"] = ca_cert_path
-            os.environ["REQUESTS_CA_BUNDLE"] = ca_cert_path
-            os.environ["CURL_CA_BUNDLE"] = ca_cert_path
+            os.environ.update(dict.fromkeys(_CA_BUNDLE_ENV_VARS, ca_cert_path))
         else:
             print(f"Warning: Custom CA certificate file not found: {ca_cert_path}")
     
@@ -1099,82 +1871,50 @@ def colabconnect(proxy_url="proxy.company.com", proxy_port=8080,
     if disable_ssl_verification:
         print("Warning: SSL verification is disabled. This is not secure for production use.")
         # Set multiple environment variables to disable SSL verification in different components
-        os.environ["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-        os.environ["CURL_CA_BUNDLE"] = ""  # Empty to disable curl certificate verification
-        os.environ["SSL_CERT_FILE"] = ""    # Empty to disable Python SSL certificate verification
-        os.environ["GIT_SSL_NO_VERIFY"] = "1"  # For git operations
-        os.environ["npm_config_strict_ssl"] = "false"  # For npm
-    
-    print("Installing python libraries...")
-    run("pip3 install --user flake8 black ipywidgets twine")
-    run("pip3 install -U ipykernel")
-    run("apt install htop -y")
-
-    # Proxy string for curl
-    # Check if proxy_url already includes a protocol prefix
-    if proxy_url.startswith("http://") or proxy_url.startswith("https://"):
-        proxy_string = f"{proxy_url}:{proxy_port}"
+        os.environ.update(_SSL_BYPASS_ENV)
+    
+    # Only install what is missing; a warm kernel skips pip and apt entirely
+    missing = [name for name in PYTHON_PACKAGES if force_install or find_spec(name) is None]
+    install_commands = []
+    if missing:
+        install_commands.append("pip3 install --user -U --no-input --disable-pip-version-check "
+                                f"--quiet {' '.join(missing)}")
+    if force_install or not _which("htop"):
+        install_commands.append("apt-get install -y htop")
+    if install_commands:
+        print("Installing python libraries...")
+        # Warm the DNS cache for the proxy while pip and apt are busy
+        prefetch = threading.Thread(target=resolve_hostname, args=(proxy_url,), daemon=True)
+        prefetch.start()
+        # The installs are independent, so run pip and apt side by side
+        run_parallel(install_commands)
+        _which.cache_clear()
+        prefetch.join()
     else:
-        proxy_string = f"http://{proxy_url}:{proxy_port}"
+        print("Python libraries already installed")
+
+    # Resolve the proxy hostname once; the download, openssl and the tunnel all reuse the IP
+    proxy_ip, proxy_string = _proxy_address(proxy_url, proxy_port)
+    http_proxy = f"http://{_url_host(proxy_ip)}:{proxy_port}"
     
     print(f"Using proxy: {proxy_string}")
     
-    print("Installing vscode-cli...")
-    vscode_cli_downloaded = False
-    
-    try:
+    # Reuse a CLI left over from an earlier run instead of downloading it again
+    if verify_vscode_cli():
+        print("Skipping vscode-cli download")
+    else:
+        print("Installing vscode-cli...")
         # Try with proxy first
         print(f"Downloading VSCode CLI using proxy: {proxy_string}")
-        curl_cmd = f"curl -Lk --proxy '{proxy_string}' 'https://code.visualstudio.com/sha/download?build=stable&os=cli-alpine-x64' --output vscode_cli.tar.gz"
-        result = subprocess.run(curl_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-        
-        if result.returncode != 0:
-            print(f"Proxy download failed: {result.stderr.decode('utf-8')}")
+        if not download_vscode_cli(proxy_string):
             print("Trying direct download...")
-            direct_cmd = "curl -Lk https://code.visualstudio.com/sha/download?build=stable&os=cli-alpine-x64 --output vscode_cli.tar.gz"
-            direct_result = subprocess.run(direct_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if direct_result.returncode == 0:
-                print("Direct download successful")
-                vscode_cli_downloaded = True
-            else:
-                print(f"Direct download failed: {direct_result.stderr.decode('utf-8')}")
-        else:
-            print("Proxy download successful")
-            vscode_cli_downloaded = True
-    except Exception as e:
-        print(f"Error during download: {str(e)}")
-        print("Trying direct download...")
-        try:
-            direct_cmd = "curl -Lk https://code.visualstudio.com/sha/download?build=stable&os=cli-alpine-x64 --output vscode_cli.tar.gz"
-            direct_result = subprocess.run(direct_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if direct_result.returncode == 0:
-                print("Direct download successful")
-                vscode_cli_downloaded = True
-            else:
-                print(f"Direct download failed: {direct_result.stderr.decode('utf-8')}")
-        except Exception as e2:
-            print(f"Error during direct download: {str(e2)}")
-    
-    if vscode_cli_downloaded:
-        print("Extracting VSCode CLI...")
-        try:
-            extract_result = subprocess.run("tar -xf vscode_cli.tar.gz", shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-#            extract_result = subprocess.run("unzip vscode_cli.zip", shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            if extract_result.returncode != 0:
-                print(f"Extraction failed: {extract_result.stderr.decode('utf-8')}")
-            else:
-                print("Extraction successful")
-        except Exception as e:
-            print(f"Error during extraction: {str(e)}")
+            download_vscode_cli()
     
     # Verify VSCode CLI is available
     if not verify_vscode_cli():
         print("ERROR: VSCode CLI not found. Cannot start tunnel.")
         return
     
-    # Strip protocol prefix for proxychains
-    clean_proxy_url = strip_protocol(proxy_url)
-    
     print("Starting the tunnel")
     
     # Try to extract the ZScaler root CA certificate
@@ -1272,8 +2012,9 @@ else:
     
     # Run the script to extract the certificate
     print(f"Running certificate extraction script...")
-    extract_cmd = f"python extract_cert.py {clean_proxy_url} {proxy_port}"
-    extract_result = subprocess.run(extract_cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+    extract_cmd = [sys.executable, "extract_cert.py", proxy_ip, str(proxy_port)]
+    # Only the CERT_FILE line on stdout is used, so stderr is not captured
+    extract_result = subprocess.run(extract_cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
     
     # Parse the output to get the certificate file path
     cert_file = None
@@ -1292,36 +2033,26 @@ else:
     
     try:
         # Set environment variables for the proxy
-        os.environ["HTTPS_PROXY"] = f"http://{clean_proxy_url}:{proxy_port}"
-        os.environ["HTTP_PROXY"] = f"http://{clean_proxy_url}:{proxy_port}"
-        os.environ["http_proxy"] = f"http://{clean_proxy_url}:{proxy_port}"
-        os.environ["https_proxy"] = f"http://{clean_proxy_url}:{proxy_port}"
+        os.environ.update(dict.fromkeys(_PROXY_ENV_VARS, http_proxy))
         
         # Set SSL verification environment variables
         if cert_file:
             # Use the extracted certificate
             print(f"Using extracted ZScaler root CA certificate: {cert_file}")
-            os.environ["NODE_EXTRA_CA_CERTS"] = cert_file
-            os.environ["SSL_CERT_FILE"] = cert_file
-            os.environ["REQUESTS_CA_BUNDLE"] = cert_file
-            os.environ["CURL_CA_BUNDLE"] = cert_file
+            os.environ.update(dict.fromkeys(_CA_BUNDLE_ENV_VARS, cert_file))
         else:
             # Disable SSL verification
             print("Disabling SSL verification (not recommended for production)")
-            os.environ["NODE_TLS_REJECT_UNAUTHORIZED"] = "0"
-            os.environ["CURL_CA_BUNDLE"] = ""
-            os.environ["SSL_CERT_FILE"] = ""
-            os.environ["GIT_SSL_NO_VERIFY"] = "1"
-            os.environ["npm_config_strict_ssl"] = "false"
+            os.environ.update(_SSL_BYPASS_ENV)
         
         # Create a simple shell script to run the VSCode CLI with the right environment
         print("Creating shell script to run VSCode CLI...")
         shell_script = f"""#!/bin/bash
 # Set environment variables
-export HTTPS_PROXY="http://{clean_proxy_url}:{proxy_port}"
-export HTTP_PROXY="http://{clean_proxy_url}:{proxy_port}"
-export http_proxy="http://{clean_proxy_url}:{proxy_port}"
-export https_proxy="http://{clean_proxy_url}:{proxy_port}"
+export HTTPS_PROXY="{http_proxy}"
+export HTTP_PROXY="{http_proxy}"
+export http_proxy="{http_proxy}"
+export https_proxy="{http_proxy}"
 """
         
         if cert_file:
@@ -1355,41 +2086,15 @@ export npm_config_strict_ssl="false"
         os.chmod("run_vscode.sh", 0o755)
         
         # Run the shell script
-        command = "./run_vscode.sh"
-        print(f"Executing command: {command}")
-        
-        # Start the process
-        p = subprocess.Popen(
-            command,
-            shell=True,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            universal_newlines=True
-        )
-        
-        # Use separate threads to read stdout and stderr
-        from threading import Thread
-        
-        def read_output(pipe, prefix):
-            for line in iter(pipe.readline, ''):
-                print(f"{prefix}: {line.strip()}")
-                if "To grant access to the server" in line:
-                    print(f"IMPORTANT: {line.strip()}")
-                if "Open this link" in line:
-                    print("Tunnel is starting...")
-                    time.sleep(5)
-                    print(message)
-        
-        # Start threads to read output
-        Thread(target=read_output, args=(p.stdout, "STDOUT")).start()
-        Thread(target=read_output, args=(p.stderr, "STDERR")).start()
+        command = ["./run_vscode.sh"]
+        print(f"Executing command: {' '.join(command)}")
         
-        # Wait for the process to complete
-        p.wait()
+        # The script exports its own SSL settings, so pass the environment unchanged
+        returncode = _run_tunnel(command, os.environ)
         
         # Check the return code
-        if p.returncode != 0:
-            print(f"WARNING: VSCode tunnel process exited with code {p.returncode}")
+        if returncode != 0:
+            print(f"WARNING: VSCode tunnel process exited with code {returncode}")
     finally:
         # Clean up temporary files
         if cert_file and os.path.exists(cert_file):
@@ -1400,22 +2105,58 @@ export npm_config_strict_ssl="false"
                 pass
 
 
-def test_github_dns_cli():
+@lru_cache(maxsize=1)
+def _cli_parser():
+    """Build the command-line parser, with one subcommand per tool, once and reuse it."""
+    import argparse
+    
+    parser = argparse.ArgumentParser(prog="python -m colabconnect.colabconnect",
+                                     description='colabconnect command-line tools')
+    subparsers = parser.add_subparsers(dest='command', metavar='<command>')
+    
+    dns = subparsers.add_parser('test_github_dns_cli', help='Test GitHub DNS resolution',
+                                description='Test GitHub DNS resolution')
+    dns.add_argument('--system-hosts', action='store_true',
+                     help='Update system hosts file (requires sudo)')
+    dns.add_argument('--no-connection-test', action='store_true',
+                     help='Skip connection test')
+    dns.add_argument('--hosts-file', type=str, default='./github_hosts_test',
+                     help='Path to hosts file (default: ./github_hosts_test)')
+    return parser
+
+
+def _test_github_connection():
+    """
+    Send a HEAD request to github.com.
+    
+    Returns:
+        tuple: (HTTP status code, None) on a response, or (None, error message)
+    """
+    try:
+        # A HEAD request is enough to get the status code, with no body to transfer
+        conn = http.client.HTTPSConnection("github.com", timeout=5, context=_verified_ssl_context())
+        try:
+            conn.request("HEAD", "/")
+            return conn.getresponse().status, None
+        finally:
+            conn.close()
+    except Exception as e:
+        return None, str(e)
+
+
+def test_github_dns_cli(args=None):
     """
     Command-line interface for testing GitHub DNS resolution.
     This function can be called directly to test DNS resolution without starting the tunnel.
-    """
-    import argparse
     
-    parser = argparse.ArgumentParser(description='Test GitHub DNS resolution')
-    parser.add_argument('--system-hosts', action='store_true',
-                        help='Update system hosts file (requires sudo)')
-    parser.add_argument('--no-connection-test', action='store_true',
-                        help='Skip connection test')
-    parser.add_argument('--hosts-file', type=str, default='./github_hosts_test',
-                        help='Path to hosts file (default: ./github_hosts_test)')
+    Args:
+        args (argparse.Namespace): Parsed options; read from sys.argv when None
     
-    args = parser.parse_args()
+    Returns:
+        int: Exit code, 0 on success
+    """
+    if args is None:
+        args = _cli_parser().parse_args(["test_github_dns_cli"] + sys.argv[1:])
     
     # If system-hosts is specified, use /etc/hosts
     hosts_file_path = '/etc/hosts' if args.system_hosts else args.hosts_file
@@ -1433,6 +2174,14 @@ def test_github_dns_cli():
         print("Failed to resolve any GitHub domains")
         return 1
     
+    # The test only depends on the hosts file when that is /etc/hosts; otherwise
+    # run it while the hosts file is being written
+    connection_test = None
+    if test_connection and not use_sudo:
+        executor = ThreadPoolExecutor(max_workers=1)
+        connection_test = executor.submit(_test_github_connection)
+        executor.shutdown(wait=False)
+    
     # Add to hosts file
     if not add_to_hosts_file(resolved_ips, hosts_file_path, use_sudo):
         print("Failed to add GitHub domains to hosts file")
@@ -1441,23 +2190,17 @@ def test_github_dns_cli():
     # Test connection if requested
     if test_connection:
         print("\nTesting connection to GitHub...")
-        try:
-            # Use curl to test connection to GitHub
-            cmd = "curl -s -o /dev/null -w '%{http_code}' https://github.com"
-            result = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
-            status_code = result.stdout.decode('utf-8').strip()
-            
-            if result.returncode == 0 and status_code.startswith('2'):
-                print(f"✓ Successfully connected to GitHub (HTTP {status_code})")
-                print("\nDNS resolution test successful!")
-                return 0
-            else:
-                print(f"✗ Failed to connect to GitHub (HTTP {status_code})")
-                print(f"Error: {result.stderr.decode('utf-8')}")
-                print("\nDNS resolution test failed!")
-                return 1
-        except Exception as e:
-            print(f"✗ Error testing connection to GitHub: {str(e)}")
+        status_code, error = connection_test.result() if connection_test else _test_github_connection()
+        if error:
+            print(f"✗ Error testing connection to GitHub: {error}")
+            print("\nDNS resolution test failed!")
+            return 1
+        if 200 <= status_code < 300:
+            print(f"✓ Successfully connected to GitHub (HTTP {status_code})")
+            print("\nDNS resolution test successful!")
+            return 0
+        else:
+            print(f"✗ Failed to connect to GitHub (HTTP {status_code})")
             print("\nDNS resolution test failed!")
             return 1
     
@@ -1465,67 +2208,120 @@ def test_github_dns_cli():
     return 0
 
 
-# If this script is run directly, handle command-line arguments
-if __name__ == "__main__":
-    import sys
-    
-    # Check if any arguments were provided
-    if len(sys.argv) > 1:
-        # If the first argument is "test_github_dns_cli", run the CLI
-        if sys.argv[1] == "test_github_dns_cli":
-            # Remove the first argument so argparse works correctly
-            sys.argv.pop(1)
-            sys.exit(test_github_dns_cli())
-        else:
-            print(f"Unknown command: {sys.argv[1]}")
-            print("Available commands:")
-            print("  test_github_dns_cli - Test GitHub DNS resolution")
-            sys.exit(1)
-    else:
-        # If no arguments were provided, print usage information
-        print("Usage: python -m colabconnect.colabconnect <command> [options]")
-        print("Available commands:")
-        print("  test_github_dns_cli - Test GitHub DNS resolution")
-        print("\nFor help with a specific command, run:")
-        print("  python -m colabconnect.colabconnect <command> --help")
-        sys.exit(0)
+# Key GitHub domains needed for authentication, in hosts file order
+GITHUB_DOMAINS = (
+    "github.com",
+    "api.github.com",
+    "codeload.github.com",
+    "raw.githubusercontent.com",
+)
+
+# Resolved GitHub IPs shared across runs; entries older than DNS_CACHE_TTL are ignored
+GITHUB_IPS_CACHE_PATH = Path.home() / ".cache" / "colabconnect" / "github_ips.json"
+
+# In-process copy of the cache file: (resolved_ips, time.time() of the lookup)
+_github_ips = None
+
 
+def _load_github_ips(allow_stale=False):
+    """
+    Return cached GitHub IPs if they are younger than DNS_CACHE_TTL, else None.
+    
+    Args:
+        allow_stale (bool): Also return entries older than DNS_CACHE_TTL
+    
+    Returns:
+        dict: Cached mapping of domain names to IP addresses, or None
+    """
+    global _github_ips
+    if _github_ips is None:
+        try:
+            with open(GITHUB_IPS_CACHE_PATH) as f:
+                _github_ips = (json.load(f), GITHUB_IPS_CACHE_PATH.stat().st_mtime)
+        except (OSError, ValueError):
+            return None
+    resolved_ips, resolved_at = _github_ips
+    if allow_stale or time.time() - resolved_at < DNS_CACHE_TTL:
+        return resolved_ips
+    return None
+
+
+def _save_github_ips(resolved_ips):
+    """Remember resolved GitHub IPs in memory and in GITHUB_IPS_CACHE_PATH."""
+    global _github_ips
+    _github_ips = (resolved_ips, time.time())
+    try:
+        GITHUB_IPS_CACHE_PATH.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = GITHUB_IPS_CACHE_PATH.with_suffix(".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(resolved_ips, f)
+        os.replace(tmp_path, GITHUB_IPS_CACHE_PATH)
+    except OSError as e:
+        print(f"Could not save GitHub DNS cache: {str(e)}")
 
-def resolve_github_domains():
+
+def resolve_github_domains(force_refresh=False, verbose=True):
     """
     Resolve key GitHub domains to their IP addresses.
     
+    Args:
+        force_refresh (bool): Ignore cached results and resolve again
+        verbose (bool): Also report the result for each domain, not only the summary
+    
     Returns:
         dict: Dictionary mapping domain names to IP addresses
     """
-    print("Resolving key GitHub domains...")
+    if not force_refresh:
+        cached = _load_github_ips()
+        if cached:
+            print(f"Using cached IPs for {len(cached)} GitHub domains")
+            return cached
     
-    # List of key GitHub domains needed for authentication
-    github_domains = [
-        "github.com",
-        "api.github.com",
-        "codeload.github.com",
-        "raw.githubusercontent.com"
-    ]
-    
-    # Dictionary to store resolved IPs
-    resolved_ips = {}
+    print("Resolving key GitHub domains...")
     
-    # Resolve each domain
-    for domain in github_domains:
-        print(f"Attempting to resolve {domain}...")
-        ip = resolve_hostname(domain)
-        if ip:
-            resolved_ips[domain] = ip
-            print(f"✓ Resolved {domain} to {ip}")
-        else:
-            print(f"✗ Failed to resolve {domain}")
+    # Resolve all domains at once; getaddrinfo releases the GIL, so the
+    # lookups overlap and the total wait is that of the slowest one
+    print(f"Attempting to resolve {', '.join(GITHUB_DOMAINS)}...")
+    found = {}
+    status_lines = []
+    with ThreadPoolExecutor(max_workers=len(GITHUB_DOMAINS)) as executor:
+        futures = {executor.submit(resolve_hostname, domain, use_doh=True): domain for domain in GITHUB_DOMAINS}
+        for future in as_completed(futures):
+            domain = futures[future]
+            ip = future.result()
+            if ip:
+                found[domain] = ip
+                status_lines.append(f"✓ Resolved {domain} to {ip}")
+            else:
+                status_lines.append(f"✗ Failed to resolve {domain}")
+    if not verbose:
+        status_lines = []
+    
+    # A failed lookup falls back to the expired cache entry, if there is one;
+    # GitHub's addresses rarely change, so a stale IP beats no IP
+    stale = {}
+    if len(found) < len(GITHUB_DOMAINS):
+        cached = _load_github_ips(allow_stale=True) or {}
+        stale = {domain: cached[domain] for domain in GITHUB_DOMAINS
+                 if domain not in found and domain in cached}
+        status_lines.extend(f"Using stale cached IP {ip} for {domain}" for domain, ip in stale.items())
+    
+    # Keep the domain order stable for the hosts file
+    resolved_ips = {domain: found.get(domain) or stale[domain]
+                    for domain in GITHUB_DOMAINS if domain in found or domain in stale}
     
     # Summary
     if resolved_ips:
-        print(f"Successfully resolved {len(resolved_ips)}/{len(github_domains)} GitHub domains")
+        status_lines.append(f"Successfully resolved {len(resolved_ips)}/{len(GITHUB_DOMAINS)} GitHub domains")
+        # Saving stale entries would make them look fresh, so only save
+        # when every IP came from a fresh lookup
+        if not stale:
+            _save_github_ips(resolved_ips)
     else:
-        print("Failed to resolve any GitHub domains")
+        status_lines.append("Failed to resolve any GitHub domains")
+    
+    # One write instead of a print per domain; each print is a round-trip to the notebook frontend
+    sys.stdout.write("\n".join(status_lines) + "\n")
     
     return resolved_ips
 
@@ -1546,44 +2342,70 @@ def add_to_hosts_file(resolved_ips, hosts_file_path="./github_hosts_test", use_s
         print("No domains to add to hosts file")
         return False
     
-    print(f"Adding {len(resolved_ips)} GitHub domains to hosts file: {hosts_file_path}")
+    # Entries already in the file are skipped, so re-running a cell does not
+    # pile up duplicates or invoke sudo again
+    existing = set()
+    try:
+        with open(hosts_file_path) as hosts_file:
+            for line in hosts_file:
+                # A line maps one IP to any number of names; comments are ignored
+                fields = line.split("#", 1)[0].split()
+                if fields:
+                    ip, *names = fields
+                    existing.update((ip, name) for name in names)
+    except OSError:
+        pass
+    needed = {domain: ip for domain, ip in resolved_ips.items()
+              if (ip, domain) not in existing}
+    if not needed:
+        print(f"Hosts file {hosts_file_path} already contains the GitHub domains")
+        return True
+    
+    print(f"Adding {len(needed)} GitHub domains to hosts file: {hosts_file_path}")
     
     # Create hosts file entries
-    hosts_entries = "\n# GitHub domains pre-resolved for VSCode tunnel testing\n"
-    for domain, ip in resolved_ips.items():
-        hosts_entries += f"{ip} {domain}\n"
+    lines = ["", "# GitHub domains pre-resolved for VSCode tunnel testing"]
+    lines.extend(f"{ip} {domain}" for domain, ip in needed.items())
+    hosts_entries = "\n".join(lines) + "\n"
     
     try:
         if use_sudo and hosts_file_path.startswith("/etc"):
             # Using sudo to append to the hosts file
             print(f"Updating hosts file at {hosts_file_path} with sudo...")
             
-            # Write to a temporary file first
-            temp_file = Path("github_hosts_entries.txt")
-            with open(temp_file, "w") as f:
-                f.write(hosts_entries)
-            
-            result = subprocess.run(
-                ["sudo", "bash", "-c", f"cat {temp_file} >> {hosts_file_path}"],
+            # Pipe the entries to tee, so no temporary file or shell is needed
+            subprocess.run(
+                ["sudo", "tee", "-a", hosts_file_path],
+                input=hosts_entries.encode(),
                 check=True,
-                stdout=subprocess.PIPE,
+                stdout=subprocess.DEVNULL,
                 stderr=subprocess.PIPE
             )
-            
-            # Clean up the temporary file
-            temp_file.unlink()
         else:
-            # Directly write to the hosts file
+            # Directly append to the hosts file, keeping earlier entries
             print(f"Writing to hosts file at {hosts_file_path}...")
-            with open(hosts_file_path, "w") as hosts_file:
+            with open(hosts_file_path, "a") as hosts_file:
                 hosts_file.write(hosts_entries)
         
         print(f"Successfully added GitHub domains to hosts file: {hosts_file_path}")
         print("Hosts file entries:")
         print(hosts_entries)
         return True
+    except subprocess.CalledProcessError as e:
+        # stderr is only decoded when sudo or tee actually failed
+        print(f"Failed to update hosts file: {e.stderr.decode('utf-8', 'replace').strip() or str(e)}")
+        return False
     except Exception as e:
         print(f"Failed to update hosts file: {str(e)}")
         return False
 
 
+# If this script is run directly, handle command-line arguments
+if __name__ == "__main__":
+    parser = _cli_parser()
+    args = parser.parse_args()
+    if args.command == "test_github_dns_cli":
+        sys.exit(test_github_dns_cli(args))
+    # No command given: print usage information
+    parser.print_help()
+    sys.exit(0)